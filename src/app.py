@@ -1,30 +1,55 @@
 import os
+import json
+import time
+import uuid
+import asyncio
+import contextlib
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Dict, Any
-import chromadb
+from typing import Dict, Any, List, Optional, Tuple
 from llama_index.core.llms import ChatMessage
-from llama_index.llms.groq import Groq
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.vector_stores.chroma import ChromaVectorStore
 
 
-from src.workflows.main_workflow import MainResearchWorkflow
-from src.memory.short_term_memory import ShortTermMemory
+from src.workflows.main_workflow import MainResearchWorkflow, ProgressEvent, SourcesEvent, TokenEvent
+from src.memory.session_store import SessionStore
 from src.memory.long_term_memory import LongTermMemory
-from src.tools.keyword_extractor import create_keyword_extraction_tool
+from src.memory.flush_queue import MemoryFlushQueue
+from src.tools.keyword_extractor import KeywordExtractionTool, create_keyword_extraction_tool
 from src.tools.summarizer import create_summarization_tool
 from src.retrieval.query_engine import create_query_engine
-from src.utils.config import GROQ_API_KEY, GROQ_MODEL, EMBEDDING_MODEL
+from src.retrieval.keyphrase_index import KeyphraseIndex
+from src.retrieval.retrievers import create_vector_store, get_corpus_fingerprint, reopen_vector_store
+from src.utils.config import (
+    EMBEDDING_MODEL,
+    CORPUS_CHECK_INTERVAL,
+    BATCH_MAX_QUERIES,
+    BATCH_WORKFLOW_CONCURRENCY,
+    ADMISSION_MAX_IN_FLIGHT_DIRECT,
+    ADMISSION_MAX_IN_FLIGHT_PLANNING,
+    ADMISSION_MAX_QUEUE_DIRECT,
+    ADMISSION_MAX_QUEUE_PLANNING,
+)
 from src.utils.logging_setup import setup_logging
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from llama_index.core import Settings
 from src.workflows.query_planning_workflow import QueryPlanningWorkflow
+from src.workflows.plan_cache import PlanCache, SubQueryResultCache, normalize_query, query_anchors
+from src.workflows.router import QueryRouter, RouteTelemetry
 
-import hashlib
-from src.utils.caching import CacheManager
+from src.utils.caching import CacheManager, make_cache_key, corpus_tag, session_tag
+from src.utils.semantic_cache import SemanticCache
+from src.utils.embedding_service import SharedEmbedding
+from src.utils.single_flight import SingleFlight
+from src.utils.admission import AdmissionPool, AdmissionTicket, Overloaded
+from src.utils.llm_dispatcher import (
+    LLMDispatcher, Priority, create_groq_llm, create_http_client, track_llm_usage
+)
 
 
 # Setup logging
@@ -38,34 +63,129 @@ async def lifespan(app: FastAPI):
     # --- Ran on startup ---
     print("Initializing core components...")
     # Initialize components that can be shared across requests
-    llm = Groq(api_key=GROQ_API_KEY, model=GROQ_MODEL)
-    embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL)
+    # Every LLM call shares one keep-alive client and one rate limiter; memory
+    # extraction runs at background priority so it yields to user requests
+    http_client = create_http_client()
+    app_state["llm_dispatcher"] = LLMDispatcher()
+    provider_llm = create_groq_llm(http_client)
+    llm = app_state["llm_dispatcher"].bind(provider_llm, Priority.INTERACTIVE)
+    background_llm = app_state["llm_dispatcher"].bind(provider_llm, Priority.BACKGROUND)
+    # One model instance serves retrieval, memory, the semantic cache and KeyBERT
+    embed_model = SharedEmbedding(HuggingFaceEmbedding(model_name=EMBEDDING_MODEL))
+    keyword_extractor = KeywordExtractionTool(sentence_model=embed_model.sentence_transformer)
 
     Settings.llm = llm
     Settings.embed_model = embed_model
 
-    chroma_client = chromadb.PersistentClient(path="./chroma_db")
-    chroma_collection = chroma_client.get_or_create_collection("research-assistant-collection")
-    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+    vector_store = create_vector_store()
+    # Built at ingest time; shared by topic boosting in retrieval and the research-context memory
+    keyphrase_index = KeyphraseIndex.load()
 
     # Store components in the app_state dictionary
-    app_state["long_term_memory"] = LongTermMemory(vector_store=vector_store, llm=llm, embed_model=embed_model)
-    app_state["query_engine"] = create_query_engine(vector_store)
+    app_state["embed_model"] = embed_model
+    app_state["keyword_extractor"] = keyword_extractor
+    app_state["long_term_memory"] = LongTermMemory(
+        vector_store=vector_store, llm=background_llm, embed_model=embed_model, keyword_extractor=keyword_extractor,
+        keyphrase_index=keyphrase_index,
+    )
+    app_state["memory_flush_queue"] = MemoryFlushQueue(app_state["long_term_memory"])
+    app_state["memory_flush_queue"].start()
+    app_state["vector_store"] = vector_store
+    app_state["keyphrase_index"] = keyphrase_index
+    # Both workflows hold this dict, so a corpus refresh can swap the engine for both
+    app_state["query_engines"] = {"default": create_query_engine(vector_store, keyphrase_index=keyphrase_index)}
     app_state["tools"] = [
-        create_keyword_extraction_tool(),
+        create_keyword_extraction_tool(keyword_extractor),
         create_summarization_tool(llm=llm)
     ]
     # IMPORTANT: Initialize the QueryPlanningWorkflow
-    app_state["query_planning_workflow"] = QueryPlanningWorkflow(llm=llm, query_engines={"default": app_state["query_engine"]})
     app_state["cache_manager"] = CacheManager()
+    # Entries cached against an older corpus version are dropped here
+    await app_state["cache_manager"].set_corpus_fingerprint(get_corpus_fingerprint(vector_store))
+    app_state["plan_cache"] = PlanCache(embed_model=embed_model)
+    app_state["sub_query_cache"] = SubQueryResultCache(app_state["cache_manager"])
+    app_state["query_planning_workflow"] = QueryPlanningWorkflow(
+        llm=llm,
+        query_engines=app_state["query_engines"],
+        plan_cache=app_state["plan_cache"],
+        result_cache=app_state["sub_query_cache"],
+    )
+    app_state["semantic_cache"] = SemanticCache(embed_model=embed_model)
+    app_state["session_store"] = SessionStore()
+    app_state["single_flight"] = SingleFlight()
+    app_state["router"] = QueryRouter(embed_model=embed_model)
+    app_state["route_telemetry"] = RouteTelemetry()
+    # Planning fans out into several LLM calls, so it gets its own, smaller pool
+    app_state["admission"] = {
+        "direct": AdmissionPool("direct", ADMISSION_MAX_IN_FLIGHT_DIRECT, ADMISSION_MAX_QUEUE_DIRECT),
+        "planning": AdmissionPool("planning", ADMISSION_MAX_IN_FLIGHT_PLANNING, ADMISSION_MAX_QUEUE_PLANNING),
+    }
+    session_eviction = asyncio.create_task(app_state["session_store"].run_eviction_loop())
+    corpus_watch = asyncio.create_task(_watch_corpus())
+    # Built once and shared: each request passes its session memory and budgets to run()
+    app_state["main_workflow"] = MainResearchWorkflow(
+        llm=llm,
+        tools=app_state["tools"],
+        memory_system={
+            "long_term": app_state["long_term_memory"],
+            "flush_queue": app_state["memory_flush_queue"],
+        },
+        query_engines=app_state["query_engines"],
+        query_planning_workflow=app_state["query_planning_workflow"],
+        router=app_state["router"],
+    )
 
     print("Initialization complete.")
     yield
     # --- Ran on shutdown ---
+    # Let queued long-term memory updates finish before tearing anything down
+    await app_state["memory_flush_queue"].drain()
+    session_eviction.cancel()
+    corpus_watch.cancel()
+    await app_state["session_store"].close()
+    await app_state["cache_manager"].close()
+    await http_client.aclose()
+    app_state["keyword_extractor"].close()
     app_state.clear()
     print("Application shutdown and cleanup complete.")
 
 
+async def refresh_corpus() -> bool:
+    """Pick up a corpus re-ingested while the server is running; returns whether it changed.
+
+    Cached answers, plans and similarity entries for the old version are dropped,
+    the vector store is reopened so dense retrieval sees the new vectors, and the
+    keyword indexes are reloaded from disk.
+    """
+    cache_manager = app_state["cache_manager"]
+    fingerprint = await asyncio.to_thread(get_corpus_fingerprint, app_state["vector_store"])
+    if fingerprint == cache_manager.current_corpus_fingerprint:
+        return False
+    await cache_manager.set_corpus_fingerprint(fingerprint)
+    app_state["semantic_cache"].clear()
+    app_state["plan_cache"].clear()
+    vector_store = await asyncio.to_thread(reopen_vector_store)
+    app_state["vector_store"] = vector_store
+    app_state["long_term_memory"].set_vector_store(vector_store)
+    # Reloaded in place: long-term memory holds the same index object
+    await asyncio.to_thread(app_state["keyphrase_index"].reload)
+    # A new engine reloads BM25, and becomes hybrid if the server started on an empty corpus
+    app_state["query_engines"]["default"] = await asyncio.to_thread(
+        create_query_engine, vector_store, app_state["keyphrase_index"]
+    )
+    print(f"Corpus changed to {fingerprint}; caches cleared, vector store reopened and indexes reloaded.")
+    return True
+
+
+async def _watch_corpus(interval: float = CORPUS_CHECK_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_corpus()
+        except Exception as e:
+            print(f"Corpus refresh failed: {e}")
+
+
 # Initialize FastAPI app with the lifespan manager
 app = FastAPI(lifespan=lifespan)
 
@@ -73,40 +193,322 @@ app = FastAPI(lifespan=lifespan)
 class QueryRequest(BaseModel):
     query: str
     session_id: str = "default_session"
+    # None uses the FAST_PATH_ENABLED default; False forces the query engine's own synthesis step
+    fast_path: Optional[bool] = None
+    # Seconds the caller will wait; the workflow degrades to fit it. None uses LATENCY_BUDGET_DEFAULT
+    latency_budget: Optional[float] = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+
+
+class FeedbackRequest(BaseModel):
+    query_id: str
+    accepted: bool
+
+
+async def _lookup_cache(request: QueryRequest) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """Return a cached response (exact or semantic) and the details needed to cache a fresh one"""
+    # Answers depend on the corpus version and the session's memory, so both scope the key.
+    # Similar questions about another year, company or figure embed almost identically, so
+    # semantic hits are also confined to questions naming the same ones.
+    cache_manager = app_state["cache_manager"]
+    corpus_fingerprint = cache_manager.current_corpus_fingerprint
+    cache_entry = {
+        "query_hash": make_cache_key(request.query, corpus_fingerprint, request.session_id),
+        "scope": f"{corpus_fingerprint}:{request.session_id}:{query_anchors(request.query)}",
+        "tags": [corpus_tag(corpus_fingerprint), session_tag(request.session_id)],
+    }
+
+    # 1. Check for a cached response first
+    cached_response = await cache_manager.get_cached_response(cache_entry["query_hash"])
+    if cached_response:
+        print("Returning response from cache.")
+        return cached_response, cache_entry
+
+    # 2. Fall back to a previously answered query with the same meaning
+    semantic_cache = app_state["semantic_cache"]
+    cache_entry["embedding"] = await semantic_cache.embed(request.query)
+    similar_hash = semantic_cache.lookup(cache_entry["embedding"], scope=cache_entry["scope"])
+    if similar_hash:
+        cached_response = await cache_manager.get_cached_response(similar_hash)
+        if cached_response:
+            print("Returning response from semantic cache.")
+            return cached_response, cache_entry
+    return None, cache_entry
+
+
+async def _cache_result(cache_entry: Dict[str, Any], result: Dict[str, Any]):
+    if result.get("degradations"):
+        # A degraded answer shouldn't be served to callers with time to spare
+        return
+    await app_state["cache_manager"].cache_response(cache_entry["query_hash"], result, tags=cache_entry["tags"])
+    app_state["semantic_cache"].add(cache_entry["embedding"], cache_entry["query_hash"], scope=cache_entry["scope"])
+    print("Response cached.")
+
+
+async def _record_route(
+    request: QueryRequest, result: Dict[str, Any], latency: float, tokens: int, cached: bool = False
+) -> Dict[str, Any]:
+    """Log the route taken for router training and return a copy of the result carrying its query_id.
+
+    Results are shared by cache hits and coalesced callers, so each caller gets its own
+    query_id (and telemetry record) and the shared dict is never modified.
+    """
+    query_id = uuid.uuid4().hex
+    await app_state["route_telemetry"].record_route(
+        query_id, request.query, result.get("route") or "direct", latency, tokens, cached=cached
+    )
+    return {**result, "query_id": query_id}
+
+
+def _coalescing_key(request: QueryRequest) -> str:
+    # Trivial rewordings would produce the same answer, but session memory would not
+    corpus_fingerprint = app_state["cache_manager"].current_corpus_fingerprint
+    query_key = make_cache_key(normalize_query(request.query), corpus_fingerprint, request.session_id)
+    return f"{query_key}:{request.fast_path}:{request.latency_budget}"
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _admit(request: QueryRequest) -> Tuple[AdmissionTicket, Optional[float], str]:
+    """Take a slot in the pool for the route the query will take; raises Overloaded when shed.
+
+    Returns the ticket, what is left of the request's latency budget after queueing, and the
+    route, which the workflow is then run with so it takes the path it was admitted for.
+    """
+    route = await app_state["main_workflow"].choose_route(request.query)
+    # A speculative run may go through planning, so it is admitted like one
+    pool = app_state["admission"]["direct" if route == "direct" else "planning"]
+    started = time.monotonic()
+    # Queueing past the caller's budget is pointless, so the budget also bounds the wait
+    ticket = await pool.acquire(timeout=request.latency_budget)
+    if request.latency_budget is None:
+        return ticket, None, route
+    return ticket, request.latency_budget - (time.monotonic() - started), route
+
+
+def _overloaded_response(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+async def _resolve_query(
+    request: QueryRequest, workflow_limit: Optional[asyncio.Semaphore] = None, admit: bool = False
+) -> Tuple[Dict[str, Any], bool, Tuple[float, int]]:
+    """Answer from cache or run the workflow.
+
+    Returns the shared result, whether it was cached, and the (latency, tokens) it cost to produce.
+    """
+    cached_response, cache_entry = await _lookup_cache(request)
+    if cached_response:
+        return cached_response, True, (0.0, 0)
+
+    async def run_workflow():
+        async with workflow_limit or contextlib.nullcontext():
+            return await execute()
+
+    async def execute():
+        ticket, latency_budget, route = await _admit(request) if admit else (None, request.latency_budget, None)
+        started = time.monotonic()
+        try:
+            with track_llm_usage() as usage:
+                handler = app_state["main_workflow"].run(
+                    query=request.query,
+                    user_id=request.session_id,
+                    # Session memory outlives the request; the store keeps hot sessions in process
+                    short_term_memory=app_state["session_store"].get(request.session_id),
+                    fast_path=request.fast_path,
+                    latency_budget=latency_budget,
+                    route=route,
+                )
+            result = await handler
+        finally:
+            if ticket is not None:
+                ticket.release()
+        cost = (time.monotonic() - started, usage["tokens"])
+
+        # 3. Cache the new response before returning
+        await _cache_result(cache_entry, result)
+        return result, cost
+
+    # Concurrent misses for the same question share one workflow run
+    result, cost = await app_state["single_flight"].do(_coalescing_key(request), run_workflow)
+    return result, False, cost
+
+
+async def _answer_query(
+    request: QueryRequest, workflow_limit: Optional[asyncio.Semaphore] = None, admit: bool = False
+) -> Tuple[Dict[str, Any], bool]:
+    """Answer one caller; returns the result with this caller's query_id and whether it was cached"""
+    result, cached, (latency, tokens) = await _resolve_query(request, workflow_limit, admit)
+    return await _record_route(request, result, latency, tokens, cached=cached), cached
 
 
 @app.post("/query")
 async def process_query(request: QueryRequest):
     try:
-        # Create a unique hash for the query to use as a cache key
-        query_hash = hashlib.sha256(request.query.encode()).hexdigest()
-        cache_manager = app_state["cache_manager"]
+        result, _ = await _answer_query(request, admit=True)
+        return result
+    except Overloaded as e:
+        raise _overloaded_response(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/query/batch")
+async def batch_query(batch: BatchQueryRequest):
+    """Answer many queries in one call, streamed back as NDJSON lines in completion order"""
+    if len(batch.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+    # Duplicates (after normalization, per session) are answered once and fanned back out
+    groups: Dict[str, List[int]] = {}
+    for i, request in enumerate(batch.queries):
+        groups.setdefault(_coalescing_key(request), []).append(i)
+
+    # One forward pass covers the texts every distinct query will embed: the query itself for the
+    # semantic cache, and the query with its session history for retrieval. Later lookups hit the
+    # embedding cache (a session whose history changes mid-batch just embeds its new text).
+    requests = [batch.queries[indices[0]] for indices in groups.values()]
+    # Each session's history is read once, and all sessions are read concurrently
+    session_ids = list(dict.fromkeys(request.session_id for request in requests))
+    histories = await asyncio.gather(
+        *(app_state["session_store"].get(session_id).get_context() for session_id in session_ids)
+    )
+    short_term = {
+        session_id: MainResearchWorkflow.format_short_term(history)
+        for session_id, history in zip(session_ids, histories)
+    }
+    texts = [request.query for request in requests]
+    texts += [MainResearchWorkflow.retrieval_text(request.query, short_term[request.session_id]) for request in requests]
+    await app_state["embed_model"].aget_query_embeddings(list(dict.fromkeys(texts)))
+    # Whole workflow runs are bounded so one batch can't take over the shared LLM dispatcher
+    workflow_limit = asyncio.Semaphore(BATCH_WORKFLOW_CONCURRENCY)
+
+    async def answer(indices: List[int]) -> Tuple[List[int], Dict[str, Any]]:
+        try:
+            # Batch runs take pool slots like single queries; the workflow limit is taken first so a
+            # batch never queues more than BATCH_WORKFLOW_CONCURRENCY of them
+            result, cached, cost = await _resolve_query(batch.queries[indices[0]], workflow_limit, admit=True)
+            return indices, {"result": result, "cached": cached, "cost": cost}
+        except Exception as e:
+            return indices, {"error": str(e)}
 
-        # 1. Check for a cached response first
-        cached_response = await cache_manager.get_cached_response(query_hash)
+    async def lines():
+        tasks = [asyncio.create_task(answer(indices)) for indices in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indices, payload = await next_done
+                for i in indices:
+                    request = batch.queries[i]
+                    line = {"index": i, "query": request.query, "session_id": request.session_id}
+                    if "error" in payload:
+                        line["error"] = payload["error"]
+                    else:
+                        # Duplicates share one answer but each gets its own query_id for feedback
+                        line["result"] = await _record_route(
+                            request, payload["result"], *payload["cost"], cached=payload["cached"]
+                        )
+                        line["cached"] = payload["cached"]
+                    yield json.dumps(jsonable_encoder(line)) + "\n"
+        finally:
+            # Client went away: stop the remaining work
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/query/stream")
+async def stream_query(request: QueryRequest):
+    """Stream workflow progress, sources and response tokens as server-sent events"""
+    cached_response, cache_entry = await _lookup_cache(request)
+    ticket, latency_budget, route = None, None, None
+    if not cached_response:
+        # Shed before the stream starts so the client gets a real 429/503 status
+        try:
+            ticket, latency_budget, route = await _admit(request)
+        except Overloaded as e:
+            raise _overloaded_response(e)
+
+    async def event_source():
         if cached_response:
-            print("Returning response from cache.")
-            return cached_response
-            
-        # Create a new ShortTermMemory for each request to maintain session state
-        short_term_memory = ShortTermMemory(session_id=request.session_id)
-
-        # Create a new MainResearchWorkflow, but reuse the heavy components
-        main_workflow = MainResearchWorkflow(
-            llm=Settings.llm,
-            tools=app_state["tools"],
-            memory_system={"short_term": short_term_memory, "long_term": app_state["long_term_memory"]},
-            query_engines={"default": app_state["query_engine"]},
-            # Pass the initialized planning workflow
-            query_planning_workflow=app_state["query_planning_workflow"]
-        )
-
-        result = await main_workflow.run(query=request.query, user_id=request.session_id)
-        
-        # 2. Cache the new response before returning
-        await cache_manager.cache_response(query_hash, result)
-        print("Response cached.")
+            response = await _record_route(request, cached_response, 0.0, 0, cached=True)
+            yield _sse("token", {"delta": response["response"]})
+            yield _sse("done", {"query": request.query, "query_id": response["query_id"], "cached": True})
+            return
+        started = time.monotonic()
+        with track_llm_usage() as usage:
+            handler = app_state["main_workflow"].run(
+                query=request.query,
+                user_id=request.session_id,
+                short_term_memory=app_state["session_store"].get(request.session_id),
+                fast_path=request.fast_path,
+                latency_budget=latency_budget,
+                route=route,
+                stream=True,
+            )
+        try:
+            async for ev in handler.stream_events():
+                if isinstance(ev, ProgressEvent):
+                    yield _sse("progress", {"step": ev.step, "message": ev.message})
+                elif isinstance(ev, SourcesEvent):
+                    yield _sse("sources", ev.sources)
+                elif isinstance(ev, TokenEvent):
+                    yield _sse("token", {"delta": ev.delta})
+            result = await handler
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        finally:
+            ticket.release()
+        response = await _record_route(request, result, time.monotonic() - started, usage["tokens"])
+        yield _sse("done", {
+            "query": request.query,
+            "query_id": response["query_id"],
+            "cached": False,
+            "degradations": result.get("degradations", []),
+        })
+        # The client already has the full answer; caching happens after the stream closes
+        await _cache_result(cache_entry, result)
 
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    # The background task covers a client that disconnects before the stream starts
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        background=BackgroundTask(ticket.release) if ticket else None,
+    )
+
+
+@app.post("/feedback")
+async def record_feedback(feedback: FeedbackRequest):
+    """Whether the user accepted an answer; used to retrain the query router"""
+    await app_state["route_telemetry"].record_feedback(feedback.query_id, feedback.accepted)
+    return {"query_id": feedback.query_id, "status": "recorded"}
+
+
+@app.delete("/cache/sessions/{session_id}")
+async def invalidate_session_cache(session_id: str):
+    await app_state["cache_manager"].invalidate_tag(session_tag(session_id))
+    return {"session_id": session_id, "status": "invalidated"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "coalescing": app_state["single_flight"].get_stats(),
+        "llm": app_state["llm_dispatcher"].get_stats(),
+        "admission": {route: pool.get_stats() for route, pool in app_state["admission"].items()},
+        "router": app_state["router"].get_stats(),
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "semantic": app_state["semantic_cache"].get_stats(),
+        "plan": app_state["plan_cache"].get_stats(),
+        "sub_query": app_state["sub_query_cache"].get_stats(),
+    }
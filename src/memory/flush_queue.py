@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from llama_index.core.llms import ChatMessage
+
+from src.utils.config import (
+    MEMORY_FLUSH_QUEUE_SIZE,
+    MEMORY_FLUSH_BATCH_SIZE,
+    MEMORY_FLUSH_BATCH_WAIT,
+    MEMORY_FLUSH_MAX_RETRIES,
+    MEMORY_FLUSH_DRAIN_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryFlushQueue:
+    """Background worker that batches conversation turns into long-term memory flushes.
+
+    Requests hand their turn to `submit` and return immediately. The worker
+    groups up to `batch_size` turns (waiting at most `batch_wait` seconds for
+    a batch to fill) and retries only the memory blocks that failed.
+    """
+    def __init__(
+        self,
+        long_term_memory,
+        max_queue_size: int = MEMORY_FLUSH_QUEUE_SIZE,
+        batch_size: int = MEMORY_FLUSH_BATCH_SIZE,
+        batch_wait: float = MEMORY_FLUSH_BATCH_WAIT,
+        max_retries: int = MEMORY_FLUSH_MAX_RETRIES,
+        retry_backoff: float = 0.5,
+    ):
+        self.long_term_memory = long_term_memory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "asyncio.Queue[List[ChatMessage]]" = asyncio.Queue(maxsize=max_queue_size)
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"submitted": 0, "dropped": 0, "flushed_turns": 0, "failed_turns": 0}
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, messages: List[ChatMessage]) -> bool:
+        """Queue one conversation turn; returns False if the queue is full and the turn was dropped"""
+        try:
+            self._queue.put_nowait(messages)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("Memory flush queue full, dropping turn")
+            return False
+        self.stats["submitted"] += 1
+        return True
+
+    async def _next_batch(self) -> List[List[ChatMessage]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, turns: List[List[ChatMessage]]):
+        messages = [message for turn in turns for message in turn]
+        pending = None
+        for attempt in range(self.max_retries + 1):
+            pending = await self.long_term_memory.process_memory_flush(messages, block_names=pending)
+            if not pending:
+                self.stats["flushed_turns"] += len(turns)
+                return
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        self.stats["failed_turns"] += len(turns)
+        logger.error("Giving up on memory flush for blocks %s after %d retries", pending, self.max_retries)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            except Exception:
+                self.stats["failed_turns"] += len(batch)
+                logger.exception("Memory flush failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def join(self):
+        """Wait until every queued turn has been flushed"""
+        await self._queue.join()
+
+    async def drain(self, timeout: float = MEMORY_FLUSH_DRAIN_TIMEOUT):
+        """Flush what is queued (bounded by `timeout`) and stop the worker"""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Memory flush drain timed out with %d turns queued", self._queue.qsize())
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
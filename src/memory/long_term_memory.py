@@ -3,12 +3,25 @@ from llama_index.core.memory import (
     FactExtractionMemoryBlock,
     VectorMemoryBlock
 )
-from typing import List
+from typing import List, Optional
+import asyncio
+import logging
 from llama_index.core.llms import ChatMessage, LLM
 from .memory_blocks import ResearchContextMemoryBlock
+from src.tools.keyword_extractor import KeywordExtractionTool
+from src.retrieval.keyphrase_index import KeyphraseIndex
+
+logger = logging.getLogger(__name__)
 
 class LongTermMemory:
-    def __init__(self, vector_store, llm: LLM, embed_model):
+    def __init__(
+        self,
+        vector_store,
+        llm: LLM,
+        embed_model,
+        keyword_extractor: Optional[KeywordExtractionTool] = None,
+        keyphrase_index: Optional[KeyphraseIndex] = None,
+    ):
         self.memory_blocks = [
             StaticMemoryBlock(
                 name="system_info",
@@ -29,14 +42,31 @@ class LongTermMemory:
             ),
             ResearchContextMemoryBlock(
                 name="research_context",
-                llm=llm # Pass llm to ResearchContextMemoryBlock
+                llm=llm, # Pass llm to ResearchContextMemoryBlock
+                keyword_extractor=keyword_extractor,
+                keyphrase_index=keyphrase_index,
             )
         ]
 
-    async def process_memory_flush(self, messages: List[ChatMessage]):
-        """Process messages when short-term memory flushes"""
+    def set_vector_store(self, vector_store):
+        """Point the conversation-history block at a reopened vector store"""
         for block in self.memory_blocks:
-            await block._aput(messages)
+            if isinstance(block, VectorMemoryBlock):
+                block.vector_store = vector_store
+
+    async def process_memory_flush(
+        self, messages: List[ChatMessage], block_names: Optional[List[str]] = None
+    ) -> List[str]:
+        """Process messages when short-term memory flushes; returns the names of blocks that failed"""
+        blocks = [b for b in self.memory_blocks if block_names is None or b.name in block_names]
+        # Blocks are independent (LLM fact extraction, embedding, keyword extraction), so run them together
+        results = await asyncio.gather(*(block._aput(messages) for block in blocks), return_exceptions=True)
+        failed = []
+        for block, result in zip(blocks, results):
+            if isinstance(result, Exception):
+                logger.warning("Memory block %s failed to process flush: %s", block.name, result)
+                failed.append(block.name)
+        return failed
 
     async def get_relevant_context(self, query: str) -> str:
         # This is a placeholder. In a real implementation, this would
@@ -2,6 +2,8 @@ from llama_index.core.memory import BaseMemoryBlock
 from llama_index.core.llms import ChatMessage, LLM
 from typing import List, Optional, Dict, Any
 from src.tools.keyword_extractor import KeywordExtractionTool
+from src.retrieval.keyphrase_index import KeyphraseIndex
+from src.utils.config import RESEARCH_CONTEXT_MAX_REGIONS
 from pydantic import Field
 
 class ResearchContextMemoryBlock(BaseMemoryBlock[str]):
@@ -10,20 +12,35 @@ class ResearchContextMemoryBlock(BaseMemoryBlock[str]):
     research_topics: Dict[str, Any] = Field(default_factory=dict)
     user_preferences: Dict[str, Any] = Field(default_factory=dict)
     keyword_extractor: KeywordExtractionTool = Field(default_factory=KeywordExtractionTool)
+    # Maps research topics to the document regions that cover them, from the ingest-time index
+    keyphrase_index: Optional[KeyphraseIndex] = None
+    max_regions: int = RESEARCH_CONTEXT_MAX_REGIONS
 
-    def __init__(self, name: str = "research_context", llm: Optional[LLM] = None):
+    def __init__(
+        self,
+        name: str = "research_context",
+        llm: Optional[LLM] = None,
+        keyword_extractor: Optional[KeywordExtractionTool] = None,
+        keyphrase_index: Optional[KeyphraseIndex] = None,
+    ):
         # pass both name and llm to pydantic's BaseModel init
-        super().__init__(name=name, llm=llm)
+        kwargs = {"keyword_extractor": keyword_extractor} if keyword_extractor is not None else {}
+        super().__init__(name=name, llm=llm, keyphrase_index=keyphrase_index, **kwargs)
 
     async def _extract_research_topics(self, content: str) -> Dict[str, Any]:
         # Use the keyword extraction tool to identify research topics.
-        keywords = self.keyword_extractor.extract_keywords_yake(content)
+        keywords = await self.keyword_extractor.aextract_keywords_yake(content)
         return {"topics": [kw[0] for kw in keywords]}
 
     async def _aget(self, messages: Optional[List[ChatMessage]] = None, **kwargs) -> str:
         context = []
         if self.research_topics:
-            context.append(f"Current research topics: {', '.join(self.research_topics.get('topics', []))}")
+            topics = self.research_topics.get('topics', [])
+            context.append(f"Current research topics: {', '.join(topics)}")
+            if self.keyphrase_index is not None:
+                regions = self.keyphrase_index.top_regions(topics, self.max_regions)
+                if regions:
+                    context.append(f"Relevant document sections: {', '.join(region for region, _ in regions)}")
         if self.user_preferences:
             context.append(f"User preferences: {self.user_preferences}")
         return "\n".join(context)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from .short_term_memory import ShortTermMemory
+from src.utils.config import (
+    SESSION_DB_URI,
+    SESSION_MAX_HOT,
+    SESSION_TOKEN_LIMIT,
+    SESSION_IDLE_TTL,
+    SESSION_RETENTION,
+    SESSION_EVICTION_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Table written by llama-index's SQLAlchemyChatStore, which backs Memory
+MEMORY_TABLE = "llama_index_memory"
+
+
+class SessionStore:
+    """Keeps hot ShortTermMemory instances in an LRU and persists every session to SQLite.
+
+    Evicting a session from the hot tier only drops the in-process object;
+    its messages stay in the database and are read back on the next turn.
+    Sessions idle for longer than `retention` seconds are purged from disk.
+    """
+    def __init__(
+        self,
+        database_uri: str = SESSION_DB_URI,
+        max_hot_sessions: int = SESSION_MAX_HOT,
+        token_limit: int = SESSION_TOKEN_LIMIT,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        retention: float = SESSION_RETENTION,
+    ):
+        self.engine = create_async_engine(database_uri)
+        self.max_hot_sessions = max_hot_sessions
+        self.token_limit = token_limit
+        self.idle_ttl = idle_ttl
+        self.retention = retention
+        self._sessions: "OrderedDict[str, Tuple[float, ShortTermMemory]]" = OrderedDict()
+
+    def get(self, session_id: str) -> ShortTermMemory:
+        """Return the session's memory, reattaching it to the database if it isn't hot"""
+        entry = self._sessions.pop(session_id, None)
+        memory = entry[1] if entry else ShortTermMemory(
+            session_id=session_id, token_limit=self.token_limit, async_engine=self.engine
+        )
+        self._sessions[session_id] = (time.monotonic(), memory)
+        while len(self._sessions) > self.max_hot_sessions:
+            self._sessions.popitem(last=False)
+        return memory
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def evict_idle(self) -> int:
+        """Drop idle sessions from the hot tier and purge expired data from disk"""
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [session_id for session_id, (last_used, _) in self._sessions.items() if last_used < cutoff]
+        for session_id in idle:
+            del self._sessions[session_id]
+        await self._purge_expired()
+        return len(idle)
+
+    async def _purge_expired(self):
+        async with self.engine.begin() as conn:
+            has_table = await conn.run_sync(lambda sync_conn: sync_conn.dialect.has_table(sync_conn, MEMORY_TABLE))
+            if not has_table:
+                return
+            # Archived messages have already been flushed out of the token window
+            await conn.execute(text(f"DELETE FROM {MEMORY_TABLE} WHERE status = 'archived'"))
+            await conn.execute(
+                text(
+                    f"DELETE FROM {MEMORY_TABLE} WHERE key IN ("
+                    f"SELECT key FROM {MEMORY_TABLE} GROUP BY key HAVING MAX(timestamp) < :cutoff)"
+                ),
+                {"cutoff": time.time_ns() - int(self.retention * 1e9)},
+            )
+
+    async def run_eviction_loop(self, interval: float = SESSION_EVICTION_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception:
+                logger.exception("Session eviction failed")
+
+    async def close(self):
+        self._sessions.clear()
+        await self.engine.dispose()
@@ -1,23 +1,27 @@
 from llama_index.core.memory import Memory, ChatMemoryBuffer
 from llama_index.core.llms import ChatMessage
+from sqlalchemy.ext.asyncio import AsyncEngine
 from typing import List, Optional
 
 class ShortTermMemory:
-    def __init__(self, session_id: str, token_limit: int = 4000):
+    def __init__(self, session_id: str, token_limit: int = 4000, async_engine: Optional[AsyncEngine] = None):
+        # With an engine the conversation is persisted there; otherwise it lives in an in-memory SQLite
+        self.session_id = session_id
         self.memory = Memory.from_defaults(
             session_id=session_id,
-            token_limit=token_limit
+            token_limit=token_limit,
+            async_engine=async_engine
         )
 
     async def add_message(self, role: str, content: str):
         """Add a message to short-term memory"""
         message = ChatMessage(role=role, content=content)
-        self.memory.put_messages([message])
+        await self.memory.aput_messages([message])
 
     async def get_context(self) -> List[ChatMessage]:
         """Retrieve conversation context"""
-        return self.memory.get()
+        return await self.memory.aget()
 
     async def clear_context(self):
         """Clear short-term memory"""
-        self.memory.reset()
\ No newline at end of file
+        await self.memory.areset()
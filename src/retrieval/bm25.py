@@ -0,0 +1,98 @@
+import heapq
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src.utils.config import BM25_INDEX_PATH
+
+# Keeps figures such as "18.09" or "5,875" as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-process inverted index scored with Okapi BM25.
+
+    Built and updated by the ingestion pipeline and persisted as JSON next to
+    the Chroma data, so the API only has to load it.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.doc_lengths
+
+    def add(self, node_id: str, text: str):
+        if node_id in self.doc_lengths:
+            self.remove(node_id)
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings[term][node_id] = tf
+        self.doc_lengths[node_id] = len(tokens)
+        self._total_length += len(tokens)
+
+    def remove(self, node_id: str):
+        self.remove_many([node_id])
+
+    def remove_many(self, node_ids: List[str]):
+        node_ids = set(node_ids) & set(self.doc_lengths)
+        if not node_ids:
+            return
+        # Postings are keyed by term only, so one pass over the vocabulary removes the whole set
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for node_id in node_ids & docs.keys():
+                del docs[node_id]
+            if not docs:
+                del self.postings[term]
+        for node_id in node_ids:
+            self._total_length -= self.doc_lengths.pop(node_id)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        if not self.doc_lengths:
+            return []
+        n_docs = len(self.doc_lengths)
+        avg_length = self._total_length / n_docs or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for node_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[node_id] / avg_length)
+                scores[node_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path: str = BM25_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"k1": self.k1, "b": self.b, "postings": self.postings, "doc_lengths": self.doc_lengths}))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH) -> "BM25Index":
+        index = cls()
+        path = Path(path)
+        if not path.exists():
+            return index
+        data = json.loads(path.read_text())
+        index.k1, index.b = data["k1"], data["b"]
+        index.postings = defaultdict(dict, data["postings"])
+        index.doc_lengths = data["doc_lengths"]
+        index._total_length = sum(index.doc_lengths.values())
+        return index
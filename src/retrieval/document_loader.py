@@ -1,7 +1,15 @@
 from llama_index.core.readers import SimpleDirectoryReader
 from pathlib import Path
+from typing import List, Optional
+from src.utils.config import DOCUMENTS_DIR
 
-def load_documents():
-    data_dir = Path(__file__).parent.parent.parent / "data" / "documents"
-    reader = SimpleDirectoryReader(input_dir=data_dir)
+def list_document_files(data_dir: Optional[Path] = None) -> List[Path]:
+    data_dir = Path(data_dir or DOCUMENTS_DIR).resolve()
+    return sorted(path for path in data_dir.rglob("*") if path.is_file() and not path.name.startswith("."))
+
+def load_documents(input_files: Optional[List[Path]] = None):
+    if input_files is not None:
+        reader = SimpleDirectoryReader(input_files=[str(path) for path in input_files], filename_as_id=True)
+    else:
+        reader = SimpleDirectoryReader(input_dir=Path(DOCUMENTS_DIR).resolve(), filename_as_id=True)
     return reader.load_data()
@@ -0,0 +1,355 @@
+"""Incremental ingestion of data/documents into the Chroma collection.
+
+Run as ``python -m src.retrieval.ingestion``. A manifest stored next to the
+Chroma data records a content hash per file and per chunk; only files whose
+hash changed are parsed, only chunks that are new are embedded, and chunks
+of changed or deleted files that no longer exist are removed.
+
+Every chunk is also added to a BM25 keyword index persisted next to the
+manifest, used by the hybrid retriever. YAKE keyphrases are extracted for each
+chunk, stored in its metadata and added to an inverted keyphrase index, which
+retrieval uses to boost on-topic chunks and long-term memory uses to map
+research topics to document regions.
+
+Parsing and chunking run in a process pool (PDFs are split into page ranges
+with PyMuPDF), and finished chunks are embedded in batches while the
+remaining files are still being parsed.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document, TextNode
+
+from .bm25 import BM25Index
+from .keyphrase_index import KEYPHRASE_SEPARATOR, KeyphraseIndex, region_label
+from .document_loader import list_document_files, load_documents
+from .retrievers import compute_corpus_fingerprint, create_vector_store, set_corpus_fingerprint
+from src.utils.config import (
+    DOCUMENTS_DIR,
+    INGESTION_MANIFEST_PATH,
+    BM25_INDEX_PATH,
+    KEYPHRASE_INDEX_PATH,
+    KEYPHRASES_PER_CHUNK,
+    INGEST_WORKERS,
+    INGEST_PAGES_PER_TASK,
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_CHUNK_SIZE,
+    INGEST_CHUNK_OVERLAP,
+)
+
+logger = logging.getLogger(__name__)
+
+_keyword_extractor = None
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class IngestionManifest:
+    """Persistent record of file hashes and the chunk ids/hashes each file produced"""
+    def __init__(self, path: str = INGESTION_MANIFEST_PATH):
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            self.files = json.loads(self.path.read_text()).get("files", {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"files": self.files}, indent=2, sort_keys=True))
+        tmp_path.replace(self.path)
+
+    def fingerprint(self) -> str:
+        return compute_corpus_fingerprint(entry["hash"] for entry in self.files.values())
+
+
+def _count_pdf_pages(path: str) -> int:
+    import pymupdf
+
+    with pymupdf.open(path) as pdf:
+        return pdf.page_count
+
+
+def _extract_keyphrases(texts: List[str], max_keyphrases: int) -> List[List[str]]:
+    """YAKE keyphrases per text, with one extractor per worker process"""
+    global _keyword_extractor
+    if _keyword_extractor is None:
+        from src.tools.keyword_extractor import KeywordExtractionTool
+
+        _keyword_extractor = KeywordExtractionTool(workers=1)
+    return [
+        [phrase for phrase, _ in _keyword_extractor.extract_keywords_yake(text, max_keyphrases)]
+        for text in texts
+    ]
+
+
+def _parse_and_chunk(
+    path: str,
+    page_range: Optional[Tuple[int, int]],
+    chunk_size: int,
+    chunk_overlap: int,
+    max_keyphrases: int = KEYPHRASES_PER_CHUNK,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Worker: parse one file (or a page range of a PDF) into (text, metadata) chunks tagged with keyphrases"""
+    if page_range is not None:
+        import pymupdf
+
+        with pymupdf.open(path) as pdf:
+            documents = [
+                Document(
+                    text=pdf[page].get_text(),
+                    metadata={"file_path": path, "file_name": Path(path).name, "page_label": str(page + 1)},
+                )
+                for page in range(*page_range)
+            ]
+    else:
+        documents = load_documents([Path(path)])
+    # Prev/next links would point at chunk ids that get replaced on re-ingestion
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, include_prev_next_rel=False)
+    chunks = [(node.get_content(), node.metadata) for node in splitter.get_nodes_from_documents(documents)]
+    # Extracting here keeps keyphrase extraction in the same process pool as parsing
+    keyphrases = _extract_keyphrases([text for text, _ in chunks], max_keyphrases)
+    return [
+        (text, {**metadata, "keyphrases": KEYPHRASE_SEPARATOR.join(phrases)})
+        for (text, metadata), phrases in zip(chunks, keyphrases)
+    ]
+
+
+def _node_keyphrases(node) -> List[str]:
+    value = node.metadata.get("keyphrases")
+    return value.split(KEYPHRASE_SEPARATOR) if value else []
+
+
+class IncrementalIngestionPipeline:
+    def __init__(
+        self,
+        vector_store,
+        manifest: IngestionManifest,
+        embed_model=None,
+        bm25_index_path: str = BM25_INDEX_PATH,
+        keyphrase_index_path: str = KEYPHRASE_INDEX_PATH,
+        data_dir: Optional[Path] = None,
+        workers: int = INGEST_WORKERS,
+        pages_per_task: int = INGEST_PAGES_PER_TASK,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        chunk_size: int = INGEST_CHUNK_SIZE,
+        chunk_overlap: int = INGEST_CHUNK_OVERLAP,
+        max_keyphrases: int = KEYPHRASES_PER_CHUNK,
+    ):
+        self.vector_store = vector_store
+        self.embed_model = embed_model
+        self.manifest = manifest
+        self.bm25_index_path = bm25_index_path
+        self.bm25_index = BM25Index.load(bm25_index_path)
+        self.keyphrase_index_path = keyphrase_index_path
+        self.keyphrase_index = KeyphraseIndex.load(keyphrase_index_path)
+        self.data_dir = Path(data_dir or DOCUMENTS_DIR).resolve()
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.embed_batch_size = embed_batch_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_keyphrases = max_keyphrases
+
+    def _split_into_tasks(self, path: Path) -> List[Optional[Tuple[int, int]]]:
+        """PDFs are split into page ranges so one large report spreads across workers"""
+        if path.suffix.lower() != ".pdf":
+            return [None]
+        page_count = _count_pdf_pages(str(path))
+        return [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ] or [None]
+
+    def _build_nodes(self, rel_path: str, parts: List[List[Tuple[str, Dict[str, Any]]]]) -> List[TextNode]:
+        """Turn a file's chunks into nodes whose ids are derived from their content"""
+        nodes = []
+        seen = Counter()
+        for text, metadata in (chunk for part in parts for chunk in part):
+            chunk_hash = hash_text(text)
+            seen[chunk_hash] += 1
+            # The occurrence count keeps repeated boilerplate chunks distinct
+            node_id = hash_text(f"{rel_path}:{chunk_hash}:{seen[chunk_hash]}")
+            nodes.append(TextNode(
+                id_=node_id,
+                text=text,
+                metadata={**metadata, "chunk_hash": chunk_hash},
+                # Keyphrases are for indexing; they stay out of the embedded text and the LLM prompt
+                excluded_embed_metadata_keys=["keyphrases"],
+                excluded_llm_metadata_keys=["keyphrases"],
+            ))
+        return nodes
+
+    def _executor(self) -> Executor:
+        if self.workers <= 1:
+            return ThreadPoolExecutor(max_workers=1)
+        # By now the embedding model and Chroma have started threads, which a forked worker
+        # would inherit mid-state; spawned workers start clean, as in the keyword extractor
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _index_nodes(self, nodes: List[TextNode]):
+        for node in nodes:
+            self.bm25_index.add(node.node_id, node.get_content())
+            self.keyphrase_index.add(node.node_id, _node_keyphrases(node), region_label(node.metadata))
+
+    def _remove_from_indexes(self, node_ids: List[str]):
+        self.bm25_index.remove_many(node_ids)
+        self.keyphrase_index.remove_many(node_ids)
+
+    def _backfill_indexes(self, stats: Counter):
+        """Index chunks recorded in the manifest but missing from BM25 or the keyphrase index
+        (e.g. a deleted index file, or chunks ingested before keyphrases were extracted)"""
+        missing = [
+            node_id for entry in self.manifest.files.values()
+            for node_id in entry["chunks"] if node_id not in self.bm25_index or node_id not in self.keyphrase_index
+        ]
+        for start in range(0, len(missing), self.embed_batch_size):
+            nodes = self.vector_store.get_nodes(node_ids=missing[start:start + self.embed_batch_size])
+            untagged = [node for node in nodes if not node.metadata.get("keyphrases")]
+            # The vector store copies keep their old metadata; only the index gets the new keyphrases
+            for node, phrases in zip(untagged, _extract_keyphrases([n.get_content() for n in untagged], self.max_keyphrases)):
+                node.metadata["keyphrases"] = KEYPHRASE_SEPARATOR.join(phrases)
+            self._index_nodes(nodes)
+        stats["chunks_backfilled"] += len(missing)
+
+    def run(self) -> Dict[str, int]:
+        stats = Counter()
+        self._backfill_indexes(stats)
+        index = VectorStoreIndex.from_vector_store(self.vector_store, embed_model=self.embed_model)
+        current = {str(path.relative_to(self.data_dir)): path for path in list_document_files(self.data_dir)}
+
+        for rel_path in sorted(set(self.manifest.files) - set(current)):
+            stale_ids = list(self.manifest.files.pop(rel_path)["chunks"])
+            if stale_ids:
+                self.vector_store.delete_nodes(node_ids=stale_ids)
+                self._remove_from_indexes(stale_ids)
+            stats["files_deleted"] += 1
+            stats["chunks_deleted"] += len(stale_ids)
+
+        changed = {}
+        for rel_path, path in current.items():
+            file_hash = hash_file(path)
+            previous = self.manifest.files.get(rel_path)
+            if previous and previous["hash"] == file_hash:
+                stats["files_unchanged"] += 1
+            else:
+                changed[rel_path] = file_hash
+
+        # Nodes are embedded in batches as files finish parsing; a file is only
+        # recorded in the manifest once all of its new chunks have been written.
+        pending_nodes: List[TextNode] = []
+        pending_files: Dict[str, Dict[str, Any]] = {}
+
+        def flush():
+            if pending_nodes:
+                index.insert_nodes(pending_nodes)
+                self._index_nodes(pending_nodes)
+                pending_nodes.clear()
+            self.manifest.files.update(pending_files)
+            pending_files.clear()
+            # The keyword indexes are written before the manifest so they never lag behind it
+            self.bm25_index.save(self.bm25_index_path)
+            self.keyphrase_index.save(self.keyphrase_index_path)
+            self.manifest.save()
+
+        with self._executor() as executor:
+            futures = {}
+            parts: Dict[str, List] = {}
+            for rel_path in changed:
+                tasks = self._split_into_tasks(current[rel_path])
+                parts[rel_path] = [None] * len(tasks)
+                for i, page_range in enumerate(tasks):
+                    future = executor.submit(
+                        _parse_and_chunk, str(current[rel_path]), page_range,
+                        self.chunk_size, self.chunk_overlap, self.max_keyphrases,
+                    )
+                    futures[future] = (rel_path, i)
+
+            for future in as_completed(futures):
+                rel_path, i = futures[future]
+                parts[rel_path][i] = future.result()
+                if any(part is None for part in parts[rel_path]):
+                    continue
+                nodes = self._build_nodes(rel_path, parts.pop(rel_path))
+                previous = self.manifest.files.get(rel_path)
+                old_chunks = previous["chunks"] if previous else {}
+                new_nodes = [node for node in nodes if node.node_id not in old_chunks]
+                stale_ids = list(set(old_chunks) - {node.node_id for node in nodes})
+                if stale_ids:
+                    self.vector_store.delete_nodes(node_ids=stale_ids)
+                    self._remove_from_indexes(stale_ids)
+                pending_nodes.extend(new_nodes)
+                pending_files[rel_path] = {
+                    "hash": changed[rel_path],
+                    "chunks": {node.node_id: node.metadata["chunk_hash"] for node in nodes},
+                }
+                stats["files_ingested"] += 1
+                stats["chunks_embedded"] += len(new_nodes)
+                stats["chunks_deleted"] += len(stale_ids)
+                stats["chunks_reused"] += len(nodes) - len(new_nodes)
+                if len(pending_nodes) >= self.embed_batch_size:
+                    flush()
+
+        flush()
+        set_corpus_fingerprint(self.vector_store, self.manifest.fingerprint())
+        return dict(stats)
+
+
+async def _invalidate_response_cache(fingerprint: str):
+    from src.utils.caching import CacheManager
+
+    cache_manager = CacheManager()
+    try:
+        await cache_manager.set_corpus_fingerprint(fingerprint)
+    finally:
+        await cache_manager.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Incrementally ingest documents into the vector store")
+    parser.add_argument("--data-dir", default=DOCUMENTS_DIR)
+    parser.add_argument("--manifest", default=INGESTION_MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--skip-cache-invalidation", action="store_true",
+                        help="Don't drop cached responses for the previous corpus version")
+    args = parser.parse_args(argv)
+
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from src.utils.config import EMBEDDING_MODEL
+    from src.utils.logging_setup import setup_logging
+
+    setup_logging()
+    pipeline = IncrementalIngestionPipeline(
+        create_vector_store(),
+        IngestionManifest(args.manifest),
+        embed_model=HuggingFaceEmbedding(model_name=EMBEDDING_MODEL),
+        data_dir=Path(args.data_dir),
+        workers=args.workers,
+    )
+    stats = pipeline.run()
+    logger.info("Ingestion complete: %s", stats)
+    if not args.skip_cache_invalidation:
+        asyncio.run(_invalidate_response_cache(pipeline.manifest.fingerprint()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import heapq
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .bm25 import tokenize
+from src.utils.config import KEYPHRASE_INDEX_PATH
+
+# Chroma metadata values must be scalars, so a chunk's keyphrases are stored joined
+KEYPHRASE_SEPARATOR = "; "
+
+
+def region_label(metadata: Dict) -> str:
+    """Where a chunk sits in the corpus, e.g. "adobe-annual-report.pdf p. 12" """
+    label = metadata.get("file_name") or metadata.get("file_path") or "unknown"
+    if metadata.get("page_label"):
+        label += f" p. {metadata['page_label']}"
+    return label
+
+
+class KeyphraseIndex:
+    """Inverted keyphrase -> node id index built from chunk keyphrases at ingest time.
+
+    A query or a user's research topic matches every indexed keyphrase whose
+    words all appear in it, so looking up topics needs no model call. Like
+    the BM25 index it is persisted as JSON next to the Chroma data.
+    """
+    def __init__(self):
+        # keyphrase -> {node_id: weight}; a chunk's top keyphrase weighs most
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.node_keyphrases: Dict[str, List[str]] = {}
+        self.regions: Dict[str, str] = {}
+        self._phrases_by_token: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.node_keyphrases)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.node_keyphrases
+
+    def _index_phrase(self, phrase: str):
+        for token in tokenize(phrase):
+            self._phrases_by_token[token].add(phrase)
+
+    def add(self, node_id: str, keyphrases: Iterable[str], region: str = ""):
+        if node_id in self.node_keyphrases:
+            self.remove(node_id)
+        phrases = []
+        for phrase in keyphrases:
+            phrase = " ".join(tokenize(phrase))
+            if phrase and phrase not in phrases:
+                phrases.append(phrase)
+        for rank, phrase in enumerate(phrases):
+            if phrase not in self.postings:
+                self._index_phrase(phrase)
+            self.postings[phrase][node_id] = 1.0 / (rank + 1)
+        self.node_keyphrases[node_id] = phrases
+        self.regions[node_id] = region
+
+    def remove(self, node_id: str):
+        self.remove_many([node_id])
+
+    def remove_many(self, node_ids: List[str]):
+        for node_id in set(node_ids) & set(self.node_keyphrases):
+            for phrase in self.node_keyphrases.pop(node_id):
+                docs = self.postings[phrase]
+                docs.pop(node_id, None)
+                if not docs:
+                    del self.postings[phrase]
+                    for token in tokenize(phrase):
+                        self._phrases_by_token[token].discard(phrase)
+                        if not self._phrases_by_token[token]:
+                            del self._phrases_by_token[token]
+            self.regions.pop(node_id, None)
+
+    def matching_phrases(self, text: str) -> List[str]:
+        """Indexed keyphrases whose words all occur in the text"""
+        tokens = set(tokenize(text))
+        candidates = set().union(*(self._phrases_by_token.get(token, ()) for token in tokens))
+        return sorted(phrase for phrase in candidates if set(tokenize(phrase)) <= tokens)
+
+    def match(self, text: str) -> Dict[str, float]:
+        """Nodes tagged with keyphrases found in the text, scored by how many and how specific"""
+        scores: Dict[str, float] = defaultdict(float)
+        for phrase in self.matching_phrases(text):
+            # Multi-word phrases are more specific than single words
+            specificity = len(phrase.split())
+            for node_id, weight in self.postings[phrase].items():
+                scores[node_id] += weight * specificity
+        return dict(scores)
+
+    def top_regions(self, topics: Iterable[str], top_k: int = 5) -> List[Tuple[str, float]]:
+        """Document regions that best cover the given topics"""
+        scores: Dict[str, float] = defaultdict(float)
+        for topic in topics:
+            for node_id, score in self.match(topic).items():
+                scores[self.regions.get(node_id) or node_id] += score
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path: str = KEYPHRASE_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"node_keyphrases": self.node_keyphrases, "regions": self.regions}))
+        tmp_path.replace(path)
+
+    def reload(self, path: str = KEYPHRASE_INDEX_PATH):
+        """Replace the contents in place with the persisted index, keeping references to this object valid"""
+        loaded = self.load(path)
+        self.postings = loaded.postings
+        self.node_keyphrases = loaded.node_keyphrases
+        self.regions = loaded.regions
+        self._phrases_by_token = loaded._phrases_by_token
+
+    @classmethod
+    def load(cls, path: str = KEYPHRASE_INDEX_PATH) -> "KeyphraseIndex":
+        index = cls()
+        path = Path(path)
+        if not path.exists():
+            return index
+        data = json.loads(path.read_text())
+        # Phrases are stored in rank order, so the postings are rebuilt rather than persisted
+        for node_id, phrases in data["node_keyphrases"].items():
+            index.add(node_id, phrases, data["regions"].get(node_id, ""))
+        return index
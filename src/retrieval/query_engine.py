@@ -1,6 +1,8 @@
+from typing import Optional
 from llama_index.core.query_engine import RetrieverQueryEngine
+from .keyphrase_index import KeyphraseIndex
 from .retrievers import create_retriever
 
-def create_query_engine(vector_store):
-    retriever = create_retriever(vector_store)
+def create_query_engine(vector_store, keyphrase_index: Optional[KeyphraseIndex] = None):
+    retriever = create_retriever(vector_store, keyphrase_index=keyphrase_index)
     return RetrieverQueryEngine.from_args(retriever)
@@ -1,13 +1,88 @@
+import hashlib
+import logging
+from typing import Iterable, Optional
+import chromadb
+from chromadb.api.client import SharedSystemClient
 from llama_index.core import VectorStoreIndex
-from .document_loader import load_documents
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from .bm25 import BM25Index
+from .hybrid_retriever import HybridRetriever
+from .keyphrase_index import KeyphraseIndex
+from src.utils.config import CHROMA_PATH, CHROMA_COLLECTION, BM25_INDEX_PATH, RETRIEVAL_TOP_K, HYBRID_CANDIDATES_K
 
-def create_retriever(vector_store):
+logger = logging.getLogger(__name__)
+
+CORPUS_FINGERPRINT_KEY = "corpus_fingerprint"
+
+
+def create_vector_store(path: str = CHROMA_PATH, collection_name: str = CHROMA_COLLECTION) -> ChromaVectorStore:
+    chroma_client = chromadb.PersistentClient(path=path)
+    chroma_collection = chroma_client.get_or_create_collection(collection_name)
+    return ChromaVectorStore(chroma_collection=chroma_collection)
+
+
+def reopen_vector_store(path: str = CHROMA_PATH, collection_name: str = CHROMA_COLLECTION) -> ChromaVectorStore:
+    """A vector store that sees writes another process made since this one was opened.
+
+    Chroma shares one System per path within a process, and its HNSW segment
+    never re-reads the index from disk, so even a new client keeps serving the
+    old vectors. Dropping the cached Systems makes the next client load the
+    index afresh; handles opened earlier keep working on the old one.
+    """
+    SharedSystemClient.clear_system_cache()
+    return create_vector_store(path, collection_name)
+
+
+def compute_corpus_fingerprint(content_hashes: Iterable[str]) -> str:
+    """Derive a stable fingerprint of the corpus from the ingested content hashes"""
+    digest = hashlib.sha256()
+    for content_hash in sorted(content_hashes):
+        digest.update(content_hash.encode())
+    return digest.hexdigest()
+
+
+def _collection_metadata(vector_store) -> dict:
+    # The collection object keeps the metadata it was loaded with; re-read it so a
+    # running server sees fingerprints written by the ingestion CLI
+    collection = vector_store._collection
+    current = collection._client.get_collection(
+        name=collection.name, tenant=collection.tenant, database=collection.database
+    )
+    return current.metadata or {}
+
+
+def get_corpus_fingerprint(vector_store) -> str:
+    """Read the fingerprint recorded on the collection at ingest time"""
+    return _collection_metadata(vector_store).get(CORPUS_FINGERPRINT_KEY, "unversioned")
+
+
+def set_corpus_fingerprint(vector_store, fingerprint: str):
+    # Index settings (hnsw:*) cannot be re-submitted through modify()
+    metadata = {
+        key: value for key, value in _collection_metadata(vector_store).items()
+        if not key.startswith("hnsw:")
+    }
+    metadata[CORPUS_FINGERPRINT_KEY] = fingerprint
+    vector_store._collection.modify(metadata=metadata)
+
+
+def create_retriever(
+    vector_store, bm25_index_path: str = BM25_INDEX_PATH, keyphrase_index: Optional[KeyphraseIndex] = None
+):
+    # Ingestion is a separate step: python -m src.retrieval.ingestion
     if vector_store._collection.count() == 0:
-        documents = load_documents()
-        index = VectorStoreIndex.from_documents(
-            documents,
-            vector_store=vector_store,
-        )
-    else:
-        index = VectorStoreIndex.from_vector_store(vector_store)
-    return index.as_retriever()
\ No newline at end of file
+        logger.warning("Vector store is empty; run `python -m src.retrieval.ingestion` to ingest documents")
+    index = VectorStoreIndex.from_vector_store(vector_store)
+    bm25_index = BM25Index.load(bm25_index_path)
+    if len(bm25_index) == 0:
+        logger.warning("No BM25 index at %s; falling back to vector-only retrieval", bm25_index_path)
+        return index.as_retriever(similarity_top_k=RETRIEVAL_TOP_K)
+    if keyphrase_index is None:
+        keyphrase_index = KeyphraseIndex.load()
+    return HybridRetriever(
+        vector_retriever=index.as_retriever(similarity_top_k=HYBRID_CANDIDATES_K),
+        bm25_index=bm25_index,
+        vector_store=vector_store,
+        # A corpus ingested before keyphrases were extracted has an empty index; retrieval is then unfiltered
+        keyphrase_index=keyphrase_index if len(keyphrase_index) else None,
+    )
@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from src.tools.keyword_extractor import KeywordExtractionTool
+from src.utils.config import DOCUMENTS_DIR, KEYBERT_BATCH_SIZE, KEYWORD_WORKERS
+
+_VOCABULARY = (
+    "revenue subscription digital media experience creative cloud document growth margin "
+    "operating income customers enterprise annual recurring fiscal quarter segment marketing "
+    "analytics generative artificial intelligence firefly acrobat platform workflow"
+).split()
+
+
+def load_corpus(documents_dir: str, limit: int) -> List[str]:
+    """PDF pages from the documents directory, or a synthetic corpus when there are none"""
+    texts = []
+    for path in sorted(Path(documents_dir).glob("*.pdf")):
+        import pymupdf
+
+        with pymupdf.open(path) as pdf:
+            texts.extend(page.get_text() for page in pdf)
+    texts = [text for text in texts if text.strip()][:limit]
+    if texts:
+        return texts
+    rng = random.Random(0)
+    return [
+        ". ".join(" ".join(rng.choices(_VOCABULARY, k=12)) for _ in range(25)) for _ in range(limit)
+    ]
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    """Worst delay a 10ms heartbeat saw while the extraction ran"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - started - 0.01)
+    return worst
+
+
+async def _measure(coro_fn):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await coro_fn()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag
+
+
+def _report(name: str, count: int, elapsed: float, lag: float):
+    print(f"{name:>18}: {count / elapsed:8.1f} texts/s  max loop lag {lag * 1000:8.1f} ms")
+
+
+async def run(texts: List[str], workers: int, keybert_limit: int):
+    extractor = KeywordExtractionTool(workers=workers)
+    try:
+        async def inline():
+            # What the memory block used to do: YAKE straight on the event loop
+            for text in texts:
+                extractor.extract_keywords_yake(text)
+
+        async def pooled():
+            await extractor.aextract_keywords_yake_batch(texts)
+
+        # Warm the pool so worker start-up isn't counted
+        await extractor.aextract_keywords_yake_batch(texts[:workers])
+        for name, fn in (("yake inline", inline), ("yake pooled", pooled)):
+            _report(name, len(texts), *await _measure(fn))
+
+        if keybert_limit <= 0:
+            return
+        keybert_texts = texts[:keybert_limit]
+
+        async def sequential():
+            # One model call per text, each embedding its document and candidates on its own
+            for text in keybert_texts:
+                await extractor.aextract_keywords_bert_batch([text])
+
+        async def batched():
+            # Concurrent callers, as in the server: queued and embedded together in micro-batches
+            await asyncio.gather(*(extractor.aextract_keywords_bert(text) for text in keybert_texts))
+
+        # Load the model before timing
+        await extractor.aextract_keywords_bert_batch(keybert_texts[:1])
+        for name, fn in (("keybert sequential", sequential), ("keybert batched", batched)):
+            _report(name, len(keybert_texts), *await _measure(fn))
+    finally:
+        extractor.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Compare inline and pooled YAKE, and sequential and batched KeyBERT keyword extraction"
+    )
+    parser.add_argument("--documents", default=DOCUMENTS_DIR)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=KEYWORD_WORKERS)
+    # KeyBERT is far slower than YAKE, so it runs over a prefix of the corpus; 0 skips it
+    parser.add_argument("--keybert-limit", type=int, default=50)
+    args = parser.parse_args(argv)
+    texts = load_corpus(args.documents, args.limit)
+    print(f"{len(texts)} texts, {args.workers} workers, KeyBERT batches of {KEYBERT_BATCH_SIZE}")
+    asyncio.run(run(texts, args.workers, args.keybert_limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,87 @@
 from llama_index.core.tools import FunctionTool
+import asyncio
+import multiprocessing
 import yake
-from keybert import KeyBERT
-from typing import List, Tuple, Dict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple, Dict
+
+from src.utils.config import KEYWORD_WORKERS, KEYWORD_TASK_SIZE, KEYBERT_BATCH_SIZE, KEYBERT_BATCH_WINDOW
+
+Keywords = List[Tuple[str, float]]
+
+_worker_yake = None
+
+
+def _yake_batch(texts: List[str], max_keywords: int) -> List[Keywords]:
+    """Pool worker: YAKE over a slice of texts, with one extractor per process"""
+    global _worker_yake
+    if _worker_yake is None:
+        _worker_yake = yake.KeywordExtractor(lan="en", n=3, dedupLim=0.7, top=20)
+    return [_worker_yake.extract_keywords(text)[:max_keywords] for text in texts]
+
 
 class KeywordExtractionTool:
-    def __init__(self):
+    """YAKE and KeyBERT keyword extraction.
+
+    The sync methods run in the caller's thread. The async and batch variants
+    keep CPU-bound work off the event loop: YAKE runs on a bounded process
+    pool, and KeyBERT calls are micro-batched onto a single model thread that
+    embeds each batch's documents and candidates once.
+    """
+    def __init__(
+        self,
+        sentence_model: Optional[Any] = None,
+        workers: int = KEYWORD_WORKERS,
+        task_size: int = KEYWORD_TASK_SIZE,
+        keybert_batch_size: int = KEYBERT_BATCH_SIZE,
+        keybert_batch_window: float = KEYBERT_BATCH_WINDOW,
+    ):
         self.yake_extractor = yake.KeywordExtractor(
             lan="en", n=3, dedupLim=0.7, top=20
         )
-        self.keybert_extractor = KeyBERT()
+        # KeyBERT is built on first use, reusing the app's sentence-transformer when given one,
+        # so YAKE-only users (e.g. the research context memory block) never load model weights
+        self.sentence_model = sentence_model
+        self._keybert_extractor = None
+        self.workers = workers
+        self.task_size = task_size
+        self.keybert_batch_size = keybert_batch_size
+        self.keybert_batch_window = keybert_batch_window
+        self._yake_pool: Optional[Executor] = None
+        # One thread owns the model so batches never compete for it
+        self._model_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keybert")
+        self._keybert_pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._keybert_flush: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def keybert_extractor(self):
+        if self._keybert_extractor is None:
+            from keybert import KeyBERT
+
+            self._keybert_extractor = KeyBERT(model=self.sentence_model) if self.sentence_model is not None else KeyBERT()
+        return self._keybert_extractor
+
+    @keybert_extractor.setter
+    def keybert_extractor(self, extractor):
+        self._keybert_extractor = extractor
+
+    @property
+    def yake_pool(self) -> Executor:
+        if self._yake_pool is None:
+            if self.workers <= 1:
+                self._yake_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yake")
+            else:
+                # Spawned workers don't inherit the server's threads or loaded models
+                self._yake_pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+        return self._yake_pool
+
+    def close(self):
+        if self._yake_pool is not None:
+            self._yake_pool.shutdown(cancel_futures=True)
+            self._yake_pool = None
+        self._model_worker.shutdown(cancel_futures=True)
 
     def extract_keywords_yake(self, text: str, max_keywords: int = 10) -> List[Tuple[str, float]]:
         """Extract keywords using YAKE algorithm"""
@@ -18,7 +91,7 @@ class KeywordExtractionTool:
     def extract_keywords_bert(self, text: str, max_keywords: int = 10) -> List[Tuple[str, float]]:
         """Extract keywords using KeyBERT"""
         return self.keybert_extractor.extract_keywords(
-            text, keyphrase_ngram_range=(1, 2), stop_words='english', top_k=max_keywords
+            text, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=max_keywords
         )
 
     def extract_comprehensive_keywords(self, text: str) -> Dict[str, List[Tuple[str, float]]]:
@@ -28,9 +101,96 @@ class KeywordExtractionTool:
             "keybert": self.extract_keywords_bert(text)
         }
 
+    # --- batch variants ---
+
+    def _slices(self, texts: List[str]) -> List[List[str]]:
+        return [texts[start:start + self.task_size] for start in range(0, len(texts), self.task_size)]
+
+    def extract_keywords_yake_batch(self, texts: List[str], max_keywords: int = 10) -> List[Keywords]:
+        """YAKE over many texts, spread across the process pool"""
+        results = self.yake_pool.map(_yake_batch, self._slices(texts), [max_keywords] * len(texts))
+        return [keywords for batch in results for keywords in batch]
+
+    def extract_keywords_bert_batch(self, texts: List[str], max_keywords: int = 10) -> List[Keywords]:
+        """KeyBERT over many texts with one embedding pass for all documents and candidates"""
+        results: List[Keywords] = [[] for _ in texts]
+        # KeyBERT's vectorizer fails on documents without any words
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        if not indices:
+            return results
+        docs = [texts[i] for i in indices]
+        options = {"keyphrase_ngram_range": (1, 2), "stop_words": "english"}
+        doc_embeddings, word_embeddings = self.keybert_extractor.extract_embeddings(docs, **options)
+        keywords = self.keybert_extractor.extract_keywords(
+            docs, top_n=max_keywords, doc_embeddings=doc_embeddings, word_embeddings=word_embeddings, **options
+        )
+        # A single document comes back as a flat list
+        if len(docs) == 1:
+            keywords = [keywords]
+        for i, doc_keywords in zip(indices, keywords):
+            results[i] = doc_keywords
+        return results
+
+    # --- async variants ---
+
+    async def aextract_keywords_yake(self, text: str, max_keywords: int = 10) -> Keywords:
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(self.yake_pool, _yake_batch, [text], max_keywords))[0]
+
+    async def aextract_keywords_yake_batch(self, texts: List[str], max_keywords: int = 10) -> List[Keywords]:
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.yake_pool, _yake_batch, texts_slice, max_keywords)
+            for texts_slice in self._slices(texts)
+        ))
+        return [keywords for batch in results for keywords in batch]
+
+    async def aextract_keywords_bert(self, text: str, max_keywords: int = 10) -> Keywords:
+        """Queue a text for the next KeyBERT batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._keybert_pending.append((text, max_keywords, future))
+        if len(self._keybert_pending) >= self.keybert_batch_size:
+            self._flush_keybert()
+        elif self._keybert_flush is None:
+            self._keybert_flush = loop.call_later(self.keybert_batch_window, self._flush_keybert)
+        return await future
+
+    async def aextract_keywords_bert_batch(self, texts: List[str], max_keywords: int = 10) -> List[Keywords]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._model_worker, self.extract_keywords_bert_batch, texts, max_keywords)
+
+    def _flush_keybert(self):
+        if self._keybert_flush is not None:
+            self._keybert_flush.cancel()
+            self._keybert_flush = None
+        batch, self._keybert_pending = self._keybert_pending, []
+        # Requests with different max_keywords are run as separate batches
+        for max_keywords in {item[1] for item in batch}:
+            group = [item for item in batch if item[1] == max_keywords]
+            asyncio.get_running_loop().create_task(self._run_keybert_batch(group, max_keywords))
+
+    async def _run_keybert_batch(self, group: List[Tuple[str, int, asyncio.Future]], max_keywords: int):
+        try:
+            results = await self.aextract_keywords_bert_batch([text for text, _, _ in group], max_keywords)
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), keywords in zip(group, results):
+                if not future.done():
+                    future.set_result(keywords)
+
+    async def aextract_comprehensive_keywords(self, text: str) -> Dict[str, Keywords]:
+        yake_keywords, keybert_keywords = await asyncio.gather(
+            self.aextract_keywords_yake(text), self.aextract_keywords_bert(text)
+        )
+        return {"yake": yake_keywords, "keybert": keybert_keywords}
+
 # Convert to LlamaIndex tool
-def create_keyword_extraction_tool():
-    extractor = KeywordExtractionTool()
+def create_keyword_extraction_tool(extractor: Optional[KeywordExtractionTool] = None):
+    extractor = extractor or KeywordExtractionTool()
     def extract_keywords(text: str, method: str = "comprehensive") -> str:
         """Extract keywords from text using specified method"""
         if method == "yake":
@@ -40,8 +200,20 @@ def create_keyword_extraction_tool():
         else:
             keywords = extractor.extract_comprehensive_keywords(text)
         return f"Extracted keywords: {keywords}"
+
+    async def aextract_keywords(text: str, method: str = "comprehensive") -> str:
+        """Extract keywords from text using specified method"""
+        if method == "yake":
+            keywords = await extractor.aextract_keywords_yake(text)
+        elif method == "keybert":
+            keywords = await extractor.aextract_keywords_bert(text)
+        else:
+            keywords = await extractor.aextract_comprehensive_keywords(text)
+        return f"Extracted keywords: {keywords}"
+
     return FunctionTool.from_defaults(
         fn=extract_keywords,
+        async_fn=aextract_keywords,
         name="keyword_extractor",
         description="Extract important keywords and phrases from text documents"
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from src.memory.short_term_memory import ShortTermMemory
+from src.workflows.main_workflow import MainResearchWorkflow
+from src.workflows.router import QueryRouter
+
+
+class _StaticEngine:
+    """Returns the same passages instantly, so timings show workflow overhead and not retrieval"""
+    def __init__(self):
+        self.nodes = [NodeWithScore(node=TextNode(text=f"Revenue grew in segment {i}."), score=0.9) for i in range(3)]
+
+    async def aretrieve(self, query_bundle):
+        return self.nodes
+
+
+class _NoLongTermMemory:
+    async def get_relevant_context(self, query: str) -> str:
+        return ""
+
+    async def process_memory_flush(self, messages):
+        pass
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _report(name: str, samples: List[float]):
+    print(
+        f"{name:>12}: mean {statistics.mean(samples) * 1000:7.3f} ms  "
+        f"p50 {_percentile(samples, 0.5) * 1000:7.3f} ms  p99 {_percentile(samples, 0.99) * 1000:7.3f} ms"
+    )
+
+
+async def run(requests: int):
+    llm = MockLLM(max_tokens=8)
+    engines = {"default": _StaticEngine()}
+    memory_system = {"long_term": _NoLongTermMemory()}
+    # Shared across requests in both modes, as in the app
+    router = QueryRouter(model_path=None)
+
+    def build() -> MainResearchWorkflow:
+        # The arguments the per-request build used to pass
+        return MainResearchWorkflow(
+            llm=llm, tools=[], memory_system=memory_system, query_engines=engines,
+            query_planning_workflow=None, fast_path=True, router=router,
+        )
+
+    # The first build pays one-off costs (packer tokenizer, step discovery) that sharing saves only once
+    started = time.perf_counter()
+    build()
+    print(f"{'first build':>12}: {(time.perf_counter() - started) * 1000:7.3f} ms")
+    construction = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        build()
+        construction.append(time.perf_counter() - started)
+    _report("construct", construction)
+
+    shared = build()
+    # Each mode gets its own session, and requests alternate, so history growth and drift hit both alike
+    memories = {"per-request": ShortTermMemory("per-request"), "shared": ShortTermMemory("shared")}
+    runners = {
+        "per-request": lambda **kwargs: build().run(**kwargs),
+        "shared": shared.run,
+    }
+    # Warm imports and the memories' SQLite tables before timing
+    for name, memory in memories.items():
+        await runners[name](query="What was revenue?", short_term_memory=memory)
+    samples = {name: [] for name in runners}
+    for i in range(requests):
+        for name, handle in runners.items():
+            started = time.perf_counter()
+            await handle(query=f"What was revenue in quarter {i}?", short_term_memory=memories[name])
+            samples[name].append(time.perf_counter() - started)
+    for name, timings in samples.items():
+        _report(name, timings)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Compare building MainResearchWorkflow per request with one shared instance"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args(argv)
+    print(f"{args.requests} sequential direct-path requests, mock LLM and retrieval")
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
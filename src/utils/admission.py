@@ -0,0 +1,105 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from src.utils.config import ADMISSION_QUEUE_TIMEOUT
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint"""
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionTicket:
+    """A held slot; release is idempotent so every exit path can call it"""
+    def __init__(self, pool: "AdmissionPool"):
+        self._pool = pool
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionPool:
+    """Caps in-flight work with a bounded FIFO wait queue.
+
+    A full queue is rejected immediately (429); a request that can't get a slot
+    before its deadline is shed (503). Both suggest a Retry-After based on how
+    long slots are currently held.
+    """
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a slot is held, used for Retry-After
+        self._avg_hold = 1.0
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_deadline": 0}
+
+    def _retry_after(self) -> int:
+        waves = (len(self._waiters) + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(self._avg_hold * waves))
+
+    async def acquire(self, timeout: Optional[float] = None) -> AdmissionTicket:
+        """Wait for a slot for at most the pool's queue timeout, or the caller's own deadline if sooner"""
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self.stats["admitted"] += 1
+            return AdmissionTicket(self)
+        if len(self._waiters) >= self.max_queue:
+            self.stats["rejected_queue_full"] += 1
+            raise Overloaded(429, self._retry_after(), f"Too many {self.name} queries queued")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.stats["queued"] += 1
+        try:
+            timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self.stats["rejected_deadline"] += 1
+            raise Overloaded(503, self._retry_after(), f"No {self.name} capacity before the request deadline")
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+        self.stats["admitted"] += 1
+        return AdmissionTicket(self)
+
+    def _abandon(self, future: asyncio.Future):
+        if future.done() and not future.cancelled():
+            # The slot was handed over just as we gave up; pass it on
+            self._release(None)
+        else:
+            future.cancel()
+            self._waiters.remove(future)
+
+    def _release(self, held_for: Optional[float]):
+        if held_for is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_for
+        # Hand the slot straight to the next waiter so newcomers can't overtake the queue
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "avg_hold_seconds": round(self._avg_hold, 3),
+        }
@@ -1,21 +1,184 @@
-from functools import lru_cache
-import redis
+import asyncio
+import hashlib
 import pickle
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.utils.config import (
+    REDIS_URL,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_SOCKET_TIMEOUT,
+    CACHE_TTL,
+    LOCAL_CACHE_MAX_ENTRIES,
+    LOCAL_CACHE_TTL,
+)
+
+
+CURRENT_CORPUS_KEY = "corpus:current"
+
+
+def make_cache_key(query: str, corpus_fingerprint: str, scope: str) -> str:
+    """Build a response cache key bound to a corpus version and a memory scope"""
+    return hashlib.sha256(f"{corpus_fingerprint}:{scope}:{query}".encode()).hexdigest()
+
+
+def corpus_tag(corpus_fingerprint: str) -> str:
+    return f"corpus:{corpus_fingerprint}"
+
+
+def session_tag(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+class LocalTTLCache:
+    """Size-bounded in-process LRU cache with per-entry expiry"""
+    def __init__(self, max_entries: int = LOCAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        self._entries[key] = (time.monotonic() + ttl, value, frozenset(tags))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def delete_tagged(self, tag: str) -> int:
+        """Remove every entry carrying `tag`; returns how many were removed"""
+        keys = [key for key, (_, _, tags) in self._entries.items() if tag in tags]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class CacheManager:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        self.redis_client = redis.from_url(redis_url)
-
-    async def get_cached_response(self, query_hash: str) -> Optional[str]:
-        """Retrieve cached response"""
-        cached = self.redis_client.get(f"response:{query_hash}")
-        return pickle.loads(cached) if cached else None
-
-    async def cache_response(self, query_hash: str, response: str, ttl: int = 3600):
-        """Cache response with TTL"""
-        self.redis_client.setex(
-            f"response:{query_hash}",
-            ttl,
-            pickle.dumps(response)
-        )
\ No newline at end of file
+    """Two-tier response cache: in-process LRU in front of async Redis.
+
+    Redis failures never fail a request; the manager falls back to the local
+    tier and retries Redis after `retry_interval` seconds.
+    """
+    def __init__(
+        self,
+        redis_url: str = REDIS_URL,
+        local_max_entries: int = LOCAL_CACHE_MAX_ENTRIES,
+        local_ttl: int = LOCAL_CACHE_TTL,
+        max_connections: int = REDIS_MAX_CONNECTIONS,
+        socket_timeout: float = REDIS_SOCKET_TIMEOUT,
+        retry_interval: float = 30.0,
+    ):
+        self.local_cache = LocalTTLCache(max_entries=local_max_entries)
+        self.local_ttl = local_ttl
+        self.retry_interval = retry_interval
+        self._redis_down_until = 0.0
+        self.current_corpus_fingerprint: Optional[str] = None
+        pool = aioredis.ConnectionPool.from_url(
+            redis_url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+        self.redis_client = aioredis.Redis(connection_pool=pool)
+
+    @property
+    def redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self):
+        self._redis_down_until = time.monotonic() + self.retry_interval
+
+    async def get_cached_response(self, query_hash: str, namespace: str = "response") -> Optional[Any]:
+        """Retrieve cached response, preferring the local tier"""
+        key = f"{namespace}:{query_hash}"
+        cached = self.local_cache.get(key)
+        if cached is not None:
+            return cached
+        if not self.redis_available:
+            return None
+        try:
+            raw = await self.redis_client.get(key)
+        except (RedisError, OSError, asyncio.TimeoutError):
+            self._mark_redis_down()
+            return None
+        if not raw:
+            return None
+        tags, response = pickle.loads(raw)
+        self.local_cache.set(key, response, self.local_ttl, tags)
+        return response
+
+    async def cache_response(
+        self,
+        query_hash: str,
+        response: Any,
+        ttl: int = CACHE_TTL,
+        tags: Iterable[str] = (),
+        namespace: str = "response",
+    ):
+        """Cache response with TTL in both tiers, indexed under each tag for invalidation"""
+        key = f"{namespace}:{query_hash}"
+        tags = list(tags)
+        self.local_cache.set(key, response, min(ttl, self.local_ttl), tags)
+        if not self.redis_available:
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl, pickle.dumps((tags, response)))
+                for tag in tags:
+                    pipe.sadd(f"tag:{tag}", key)
+                    # Refreshed on every write so the set outlives the entries it points at
+                    pipe.expire(f"tag:{tag}", ttl)
+                await pipe.execute()
+        except (RedisError, OSError, asyncio.TimeoutError):
+            self._mark_redis_down()
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry cached under `tag` from both tiers; returns keys removed locally"""
+        removed = self.local_cache.delete_tagged(tag)
+        if self.redis_available:
+            try:
+                keys = await self.redis_client.smembers(f"tag:{tag}")
+                await self.redis_client.delete(f"tag:{tag}", *keys)
+            except (RedisError, OSError, asyncio.TimeoutError):
+                self._mark_redis_down()
+        return removed
+
+    async def set_corpus_fingerprint(self, corpus_fingerprint: str):
+        """Record the live corpus version, invalidating entries cached against the previous one"""
+        previous = local_previous = self.current_corpus_fingerprint
+        if self.redis_available:
+            try:
+                raw = await self.redis_client.getset(CURRENT_CORPUS_KEY, corpus_fingerprint)
+                previous = raw.decode() if raw else previous
+            except (RedisError, OSError, asyncio.TimeoutError):
+                self._mark_redis_down()
+        self.current_corpus_fingerprint = corpus_fingerprint
+        # After a CLI ingest Redis already holds the new version, but this process's
+        # local tier still has entries for the version it was serving
+        for stale in {previous, local_previous} - {None, corpus_fingerprint}:
+            await self.invalidate_tag(corpus_tag(stale))
+
+    async def close(self):
+        """Release pooled Redis connections"""
+        await self.redis_client.aclose()
@@ -8,3 +8,133 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "openai/gpt-oss-20b")
 # Use a smaller, faster embedding model
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-en-v1.5")
+
+# Document corpus and the Chroma collection it is ingested into
+DOCUMENTS_DIR = os.getenv("DOCUMENTS_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data", "documents"))
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "research-assistant-collection")
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", os.path.join(CHROMA_PATH, "ingestion_manifest.json"))
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join(CHROMA_PATH, "bm25_index.json"))
+KEYPHRASE_INDEX_PATH = os.getenv("KEYPHRASE_INDEX_PATH", os.path.join(CHROMA_PATH, "keyphrase_index.json"))
+
+# Hybrid retrieval: candidates from each retriever are fused with reciprocal rank fusion
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "2"))
+HYBRID_CANDIDATES_K = int(os.getenv("HYBRID_CANDIDATES_K", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Query planning: how many sub-queries may run at once and how long each may take (seconds)
+SUB_QUERY_MAX_CONCURRENCY = int(os.getenv("SUB_QUERY_MAX_CONCURRENCY", "4"))
+SUB_QUERY_TIMEOUT = float(os.getenv("SUB_QUERY_TIMEOUT", "30"))
+
+# Response cache: Redis backend plus an in-process LRU tier in front of it
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+# Entries are keyed on the corpus fingerprint, so they can live for days
+CACHE_TTL = int(os.getenv("CACHE_TTL", "604800"))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "1024"))
+LOCAL_CACHE_TTL = int(os.getenv("LOCAL_CACHE_TTL", "300"))
+
+# Semantic response cache: serve answers for paraphrased queries above this cosine similarity
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_NEAR_MISS_MARGIN = float(os.getenv("SEMANTIC_CACHE_NEAR_MISS_MARGIN", "0.05"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+
+# Conversation sessions: hot sessions stay in memory, all sessions persist to SQLite
+SESSION_DB_URI = os.getenv("SESSION_DB_URI", "sqlite+aiosqlite:///./session_store.db")
+SESSION_MAX_HOT = int(os.getenv("SESSION_MAX_HOT", "512"))
+SESSION_TOKEN_LIMIT = int(os.getenv("SESSION_TOKEN_LIMIT", "4000"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_RETENTION = int(os.getenv("SESSION_RETENTION", "604800"))
+SESSION_EVICTION_INTERVAL = int(os.getenv("SESSION_EVICTION_INTERVAL", "300"))
+# How often (seconds) the server checks whether the ingestion CLI has changed the corpus
+CORPUS_CHECK_INTERVAL = int(os.getenv("CORPUS_CHECK_INTERVAL", "30"))
+
+# Long-term memory flushes run in the background, several turns per flush
+MEMORY_FLUSH_QUEUE_SIZE = int(os.getenv("MEMORY_FLUSH_QUEUE_SIZE", "1000"))
+MEMORY_FLUSH_BATCH_SIZE = int(os.getenv("MEMORY_FLUSH_BATCH_SIZE", "4"))
+MEMORY_FLUSH_BATCH_WAIT = float(os.getenv("MEMORY_FLUSH_BATCH_WAIT", "2"))
+MEMORY_FLUSH_MAX_RETRIES = int(os.getenv("MEMORY_FLUSH_MAX_RETRIES", "3"))
+MEMORY_FLUSH_DRAIN_TIMEOUT = float(os.getenv("MEMORY_FLUSH_DRAIN_TIMEOUT", "30"))
+
+# Ingestion: parsing/chunking runs in a process pool, embeddings are computed in batches
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1024"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "200"))
+
+# Shared embedding service: text->vector LRU and micro-batching of concurrent requests
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+EMBEDDING_BATCH_WINDOW = float(os.getenv("EMBEDDING_BATCH_WINDOW", "0.005"))
+
+# Final generation prompt: token budget for evidence, conversation turns and long-term facts
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Simple queries retrieve nodes only and skip the query engine's own synthesis call
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Decomposition plan cache for complex queries
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "512"))
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", "86400"))
+PLAN_CACHE_SIMILARITY = float(os.getenv("PLAN_CACHE_SIMILARITY", "0.95"))
+SUB_QUERY_CACHE_TTL = int(os.getenv("SUB_QUERY_CACHE_TTL", "86400"))
+SUB_QUERY_DEDUP_THRESHOLD = float(os.getenv("SUB_QUERY_DEDUP_THRESHOLD", "0.8"))
+
+# Batch query endpoint
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "500"))
+# Workflow runs (retrieval, planning and generation) a single batch may have going at once
+BATCH_WORKFLOW_CONCURRENCY = int(os.getenv("BATCH_WORKFLOW_CONCURRENCY", "8"))
+
+# LLM dispatch: provider token-per-minute budget, concurrent requests and retries
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "8000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "512"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Admission control for /query: concurrent workflows and wait queue per route, queue wait deadline (seconds)
+ADMISSION_MAX_IN_FLIGHT_DIRECT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT_DIRECT", "16"))
+ADMISSION_MAX_IN_FLIGHT_PLANNING = int(os.getenv("ADMISSION_MAX_IN_FLIGHT_PLANNING", "4"))
+ADMISSION_MAX_QUEUE_DIRECT = int(os.getenv("ADMISSION_MAX_QUEUE_DIRECT", "32"))
+ADMISSION_MAX_QUEUE_PLANNING = int(os.getenv("ADMISSION_MAX_QUEUE_PLANNING", "8"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+# Latency budgets: default per-request budget in seconds (0 = none) and the
+# remaining-time thresholds at which the workflow degrades
+LATENCY_BUDGET_DEFAULT = float(os.getenv("LATENCY_BUDGET_DEFAULT", "0"))
+DEGRADE_GENERATION_RESERVE = float(os.getenv("DEGRADE_GENERATION_RESERVE", "3"))
+DEGRADE_MIN_PLANNING_TIME = float(os.getenv("DEGRADE_MIN_PLANNING_TIME", "8"))
+DEGRADE_SUB_QUERY_TIME = float(os.getenv("DEGRADE_SUB_QUERY_TIME", "3"))
+DEGRADE_LONG_TERM_MIN_TIME = float(os.getenv("DEGRADE_LONG_TERM_MIN_TIME", "6"))
+DEGRADE_REDUCED_K_TIME = float(os.getenv("DEGRADE_REDUCED_K_TIME", "5"))
+DEGRADE_REDUCED_TOP_K = int(os.getenv("DEGRADE_REDUCED_TOP_K", "1"))
+
+# Speculative routing: complexity scores inside the band run the direct and planned paths
+# together; the direct answer wins if its passages cover enough of the query's terms
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+SPECULATIVE_BAND_LOW = float(os.getenv("SPECULATIVE_BAND_LOW", "0.5"))
+SPECULATIVE_BAND_HIGH = float(os.getenv("SPECULATIVE_BAND_HIGH", "0.8"))
+SPECULATIVE_MIN_COVERAGE = float(os.getenv("SPECULATIVE_MIN_COVERAGE", "0.6"))
+
+# Adaptive query router: route telemetry, the model trained from it, and the routing policy
+ROUTER_TELEMETRY_PATH = os.getenv("ROUTER_TELEMETRY_PATH", "./telemetry/routes.jsonl")
+ROUTER_MODEL_PATH = os.getenv("ROUTER_MODEL_PATH", "./telemetry/router_model.npz")
+ROUTER_MIN_ACCEPTANCE = float(os.getenv("ROUTER_MIN_ACCEPTANCE", "0.7"))
+ROUTER_UNCERTAINTY_MARGIN = float(os.getenv("ROUTER_UNCERTAINTY_MARGIN", "0.1"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "50"))
+
+# Keyword extraction off the event loop: YAKE process pool size and texts per pool task,
+# KeyBERT micro-batch size and how long (seconds) to wait for a batch to fill
+KEYWORD_WORKERS = int(os.getenv("KEYWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+KEYWORD_TASK_SIZE = int(os.getenv("KEYWORD_TASK_SIZE", "16"))
+KEYBERT_BATCH_SIZE = int(os.getenv("KEYBERT_BATCH_SIZE", "32"))
+KEYBERT_BATCH_WINDOW = float(os.getenv("KEYBERT_BATCH_WINDOW", "0.01"))
+
+# Ingest-time keyphrase index: keyphrases stored per chunk and document regions shown per research topic set
+KEYPHRASES_PER_CHUNK = int(os.getenv("KEYPHRASES_PER_CHUNK", "8"))
+RESEARCH_CONTEXT_MAX_REGIONS = int(os.getenv("RESEARCH_CONTEXT_MAX_REGIONS", "5"))
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from src.utils.caching import LocalTTLCache
+from src.utils.config import EMBEDDING_CACHE_SIZE, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_BATCH_WINDOW
+
+
+class SharedEmbedding(BaseEmbedding):
+    """One embedding model shared by retrieval, memory, the semantic cache and KeyBERT.
+
+    Wraps another BaseEmbedding and adds:
+      * an LRU cache of text -> vector (queries and documents are cached separately),
+      * micro-batching: async requests arriving within `batch_window` seconds
+        are encoded in a single forward pass,
+      * inference in a worker thread so the event loop is never blocked.
+    """
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: LocalTTLCache = PrivateAttr()
+    _cache_lock: Any = PrivateAttr()
+    _max_batch_size: int = PrivateAttr()
+    _batch_window: float = PrivateAttr()
+    _pending: Dict[str, List[Tuple[str, asyncio.Future]]] = PrivateAttr()
+    _in_flight: Dict[str, asyncio.Future] = PrivateAttr()
+    _flush_handles: Dict[str, asyncio.TimerHandle] = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        cache_size: int = EMBEDDING_CACHE_SIZE,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        batch_window: float = EMBEDDING_BATCH_WINDOW,
+        **kwargs: Any,
+    ):
+        super().__init__(model_name=inner.model_name, embed_batch_size=inner.embed_batch_size, **kwargs)
+        self._inner = inner
+        self._cache = LocalTTLCache(max_entries=cache_size)
+        self._cache_lock = threading.Lock()
+        self._max_batch_size = max_batch_size
+        self._batch_window = batch_window
+        self._pending = {}
+        self._in_flight = {}
+        self._flush_handles = {}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SharedEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    @property
+    def sentence_transformer(self) -> Optional[Any]:
+        """The underlying SentenceTransformer, for libraries such as KeyBERT that take one directly"""
+        return getattr(self._inner, "_model", None)
+
+    # --- cache helpers ---
+
+    def _cache_get(self, kind: str, text: str) -> Optional[Embedding]:
+        with self._cache_lock:
+            return self._cache.get(f"{kind}:{text}")
+
+    def _cache_put(self, kind: str, texts: List[str], vectors: List[Embedding]):
+        with self._cache_lock:
+            for text, vector in zip(texts, vectors):
+                self._cache.set(f"{kind}:{text}", vector, ttl=float("inf"))
+
+    def _encode(self, kind: str, texts: List[str]) -> List[Embedding]:
+        """Run the wrapped model on a batch; called from worker threads"""
+        if kind == "text":
+            vectors = self._inner._get_text_embeddings(texts)
+        elif hasattr(self._inner, "_embed"):
+            # HuggingFaceEmbedding encodes a list of queries in one pass
+            vectors = self._inner._embed(texts, prompt_name="query")
+        else:
+            vectors = [self._inner._get_query_embedding(text) for text in texts]
+        self._cache_put(kind, texts, vectors)
+        return vectors
+
+    def _encode_cached(self, kind: str, texts: List[str]) -> List[Embedding]:
+        vectors = [self._cache_get(kind, text) for text in texts]
+        missing = sorted({text for text, vector in zip(texts, vectors) if vector is None})
+        if missing:
+            encoded = dict(zip(missing, self._encode(kind, missing)))
+            vectors = [vector if vector is not None else encoded[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    # --- micro-batching ---
+
+    async def _submit(self, kind: str, text: str) -> Embedding:
+        cached = self._cache_get(kind, text)
+        if cached is not None:
+            return cached
+        key = f"{kind}:{text}"
+        # Identical texts requested concurrently share one slot in the batch
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._in_flight[key] = future
+            self._pending.setdefault(kind, []).append((text, future))
+            if len(self._pending[kind]) >= self._max_batch_size:
+                self._flush(kind)
+            elif kind not in self._flush_handles:
+                self._flush_handles[kind] = loop.call_later(self._batch_window, self._flush, kind)
+        return await asyncio.shield(future)
+
+    def _flush(self, kind: str):
+        handle = self._flush_handles.pop(kind, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(kind, [])
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_batch(kind, batch))
+
+    async def _run_batch(self, kind: str, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await asyncio.to_thread(self._encode, kind, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            for text in texts:
+                self._in_flight.pop(f"{kind}:{text}", None)
+
+    # --- BaseEmbedding interface ---
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._encode_cached("query", [query])[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._encode_cached("text", [text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._encode_cached("text", texts)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._submit("query", query)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._submit("text", text)
+
+    async def aget_query_embeddings(self, queries: List[str]) -> List[Embedding]:
+        """Embed many queries in one forward pass, warming the cache for later lookups"""
+        return await asyncio.to_thread(self._encode_cached, "query", queries)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        if len(texts) >= self._max_batch_size:
+            # Already a full batch: skip the batching window
+            return await asyncio.to_thread(self._encode_cached, "text", texts)
+        return await asyncio.gather(*(self._submit("text", text) for text in texts))
@@ -0,0 +1,335 @@
+"""Rate-limited, prioritized dispatch of LLM calls.
+
+Every LLM call in the app goes through one LLMDispatcher: a token bucket sized
+to the provider's tokens-per-minute limit, a cap on concurrent requests, and a
+priority queue so user-facing generation is served before background memory
+extraction. Rate-limit and transient errors are retried with full jitter.
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterator, Optional, Sequence
+
+import httpx
+from pydantic import Field
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.llms import LLM
+
+from src.utils.config import (
+    GROQ_API_KEY,
+    GROQ_MODEL,
+    GROQ_API_BASE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_COMPLETION_TOKEN_ESTIMATE,
+    LLM_TIMEOUT,
+)
+
+try:
+    from openai import APIConnectionError
+except ImportError:  # pragma: no cover - only the Groq client needs openai
+    APIConnectionError = ConnectionError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (asyncio.TimeoutError, ConnectionError, httpx.TransportError, APIConnectionError)
+
+
+# Per-request token counter; tasks spawned while it is set (workflow steps) share it
+_usage_meter: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage_meter", default=None)
+
+
+@contextlib.contextmanager
+def track_llm_usage() -> Iterator[Dict[str, int]]:
+    """Count the LLM calls and tokens spent by everything run inside the block"""
+    meter = {"calls": 0, "tokens": 0}
+    token = _usage_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _usage_meter.reset(token)
+
+
+def _meter_usage(tokens: int):
+    meter = _usage_meter.get()
+    if meter is not None:
+        meter["calls"] += 1
+        meter["tokens"] += tokens
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after(error: Exception) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_retryable(error: Exception) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS) or _status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def _usage_tokens(response: Any) -> Optional[int]:
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return getattr(usage, "total_tokens", None)
+
+
+class LLMDispatcher:
+    def __init__(
+        self,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+        retry_max_delay: float = LLM_RETRY_MAX_DELAY,
+        completion_tokens: int = LLM_COMPLETION_TOKEN_ESTIMATE,
+    ):
+        self.capacity = float(tokens_per_minute)
+        self.refill_rate = tokens_per_minute / 60.0
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.completion_tokens = completion_tokens
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        # (priority, arrival order, tokens, future): lower priority values are served first
+        self._waiters: list = []
+        self._arrivals = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+    def bind(self, llm: LLM, priority: Priority = Priority.INTERACTIVE) -> "DispatchedLLM":
+        return DispatchedLLM(inner=llm, dispatcher=self, priority=priority)
+
+    # --- token bucket and priority queue ---
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    def _dispatch(self):
+        self._refill()
+        while self._waiters and self._in_flight < self.max_concurrency:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._tokens < tokens:
+                # The head of the queue waits for the bucket; nothing behind it may jump ahead
+                if self._timer is None:
+                    delay = (tokens - self._tokens) / self.refill_rate
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            heapq.heappop(self._waiters)
+            self._tokens -= tokens
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def _acquire(self, priority: int, tokens: int):
+        future = asyncio.get_running_loop().create_future()
+        # A request larger than the whole bucket still has to be able to run
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), min(tokens, self.capacity), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _settle(self, estimated: int, actual: Optional[int]):
+        """Charge the bucket for what the provider actually counted"""
+        if actual:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - (actual - estimated))
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        retry_after = _retry_after(error)
+        if _status_code(error) == 429:
+            # Empty the bucket so queued calls wait out the provider's window too
+            self.stats["rate_limited"] += 1
+            self._refill()
+            self._tokens = min(self._tokens, -retry_after * self.refill_rate)
+        self.stats["retries"] += 1
+        ceiling = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)
+        return max(retry_after, random.uniform(0, ceiling))
+
+    # --- calls ---
+
+    async def call(
+        self, fn: Callable[[], Awaitable[Any]], priority: int = Priority.INTERACTIVE, prompt_tokens: int = 0
+    ) -> Any:
+        estimated = prompt_tokens + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, estimated)
+            try:
+                response = await fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise
+                delay = self._backoff(e, attempt)
+                logger.warning("LLM call failed (%s), retrying in %.2fs", e, delay)
+            else:
+                self.stats["calls"] += 1
+                actual = _usage_tokens(response)
+                self._settle(estimated, actual)
+                _meter_usage(actual or estimated)
+                return response
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    async def stream(
+        self, fn: Callable[[], Awaitable[AsyncGenerator]], priority: int = Priority.INTERACTIVE, prompt_tokens: int = 0
+    ) -> AsyncGenerator:
+        """Hold a slot for the whole stream; only failures before the first chunk are retried"""
+        estimated = prompt_tokens + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, estimated)
+            started = False
+            try:
+                async for chunk in await fn():
+                    started = True
+                    yield chunk
+                self.stats["calls"] += 1
+                _meter_usage(estimated)
+                return
+            except Exception as e:
+                if started or attempt >= self.max_retries or not is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise
+                delay = self._backoff(e, attempt)
+                logger.warning("LLM stream failed (%s), retrying in %.2fs", e, delay)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def get_stats(self):
+        self._refill()
+        return {
+            **self.stats,
+            "in_flight": self._in_flight,
+            "queued": sum(1 for *_, future in self._waiters if not future.done()),
+            "tokens_available": round(self._tokens),
+        }
+
+
+def _messages_tokens(messages: Sequence[ChatMessage]) -> int:
+    return sum(estimate_tokens(message.content or "") for message in messages)
+
+
+class DispatchedLLM(LLM):
+    """LLM proxy whose async calls go through an LLMDispatcher at a fixed priority.
+
+    Sync calls are passed straight through; the app only calls LLMs from async code.
+    """
+    inner: LLM = Field(description="The provider LLM the calls are forwarded to.")
+    dispatcher: Any = Field(description="The LLMDispatcher shared by every bound LLM.")
+    priority: int = Field(default=Priority.INTERACTIVE)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "DispatchedLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.inner.metadata
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self.inner.chat(messages, **kwargs)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self.inner.complete(prompt, formatted=formatted, **kwargs)
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        return self.inner.stream_chat(messages, **kwargs)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self.inner.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return await self.dispatcher.call(
+            lambda: self.inner.achat(messages, **kwargs), self.priority, _messages_tokens(messages)
+        )
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return await self.dispatcher.call(
+            lambda: self.inner.acomplete(prompt, formatted=formatted, **kwargs), self.priority, estimate_tokens(prompt)
+        )
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        return self.dispatcher.stream(
+            lambda: self.inner.astream_chat(messages, **kwargs), self.priority, _messages_tokens(messages)
+        )
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        return self.dispatcher.stream(
+            lambda: self.inner.astream_complete(prompt, formatted=formatted, **kwargs),
+            self.priority,
+            estimate_tokens(prompt),
+        )
+
+
+def create_http_client(max_connections: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT) -> httpx.AsyncClient:
+    """One keep-alive connection pool for every LLM request"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=timeout,
+    )
+
+
+def create_groq_llm(http_client: httpx.AsyncClient, api_base: str = GROQ_API_BASE) -> LLM:
+    from llama_index.llms.groq import Groq
+
+    # Retries are the dispatcher's job; the SDK's own would bypass the rate limiter
+    return Groq(
+        api_key=GROQ_API_KEY, model=GROQ_MODEL, api_base=api_base, max_retries=0, async_http_client=http_client
+    )
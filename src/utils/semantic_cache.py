@@ -0,0 +1,90 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from src.utils.config import (
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_NEAR_MISS_MARGIN,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+
+class SemanticCache:
+    """Maps query embeddings to the cache keys of previously answered queries.
+
+    The index is a fixed-capacity ring buffer of L2-normalised vectors, so a
+    lookup is a single matrix-vector product over at most `max_entries` rows.
+    Responses themselves stay in the CacheManager; this only resolves a new
+    query to the key of a sufficiently similar old one.
+    """
+    def __init__(
+        self,
+        embed_model,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        near_miss_margin: float = SEMANTIC_CACHE_NEAR_MISS_MARGIN,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.near_miss_margin = near_miss_margin
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[Optional[str]] = [None] * max_entries
+        self._scopes: List[Optional[str]] = [None] * max_entries
+        self._size = 0
+        self._next_slot = 0
+        self.stats = {"hits": 0, "misses": 0, "near_misses": 0}
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def embed(self, query: str) -> np.ndarray:
+        """Embed a query with the shared embedding model"""
+        return self._normalize(await self.embed_model.aget_query_embedding(query))
+
+    def lookup(self, embedding: np.ndarray, scope: str = "") -> Optional[str]:
+        """Return the cache key of the most similar stored query in `scope`, if above threshold"""
+        if self._size == 0:
+            self.stats["misses"] += 1
+            return None
+        similarities = self._vectors[:self._size] @ embedding
+        out_of_scope = np.array([s != scope for s in self._scopes[:self._size]])
+        similarities[out_of_scope] = -np.inf
+        best = int(np.argmax(similarities))
+        score = float(similarities[best])
+        if score >= self.threshold:
+            self.stats["hits"] += 1
+            return self._keys[best]
+        if score >= self.threshold - self.near_miss_margin:
+            self.stats["near_misses"] += 1
+        else:
+            self.stats["misses"] += 1
+        return None
+
+    def add(self, embedding: np.ndarray, cache_key: str, scope: str = ""):
+        """Index an answered query, overwriting the oldest entry when full"""
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+        self._vectors[self._next_slot] = embedding
+        self._keys[self._next_slot] = cache_key
+        self._scopes[self._next_slot] = scope
+        self._next_slot = (self._next_slot + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self):
+        self._vectors = None
+        self._keys = [None] * self.max_entries
+        self._scopes = [None] * self.max_entries
+        self._size = 0
+        self._next_slot = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = sum(self.stats.values())
+        return {
+            **self.stats,
+            "entries": self._size,
+            "threshold": self.threshold,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
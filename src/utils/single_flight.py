@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one in-flight execution.
+
+    The shared call runs as its own task, so a caller that disconnects does not
+    cancel the work the other waiters are still awaiting.
+    """
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.stats = {"executions": 0, "coalesced": 0, "peak_waiters": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.stats["executions"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        self._waiters[key] += 1
+        self.stats["peak_waiters"] = max(self.stats["peak_waiters"], self._waiters[key])
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if key in self._waiters:
+                self._waiters[key] -= 1
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._calls.pop(key, None)
+        self._waiters.pop(key, None)
+        # Mark the exception as retrieved when every caller has already gone away
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": len(self._calls),
+            "waiters": sum(self._waiters.values()),
+        }
@@ -0,0 +1,74 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from llama_index.core.utils import get_tokenizer
+
+from src.utils.config import CONTEXT_TOKEN_BUDGET
+
+
+def _shingles(text: str, size: int = 5) -> Set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextPacker:
+    """Assembles the final-generation context under a token budget.
+
+    Sections are filled in priority order: retrieved evidence, then recent
+    conversation turns (newest first), then long-term facts. Each item is
+    tokenized once; items that would overflow the budget are skipped and
+    counted in the report, and near-duplicate evidence (e.g. overlapping
+    chunks) is dropped before anything is counted.
+    """
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        tokenizer: Optional[Callable[[str], List]] = None,
+        duplicate_threshold: float = 0.8,
+    ):
+        self.token_budget = token_budget
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.duplicate_threshold = duplicate_threshold
+
+    def _deduplicate(self, items: List[str]) -> List[str]:
+        kept, kept_shingles = [], []
+        for item in items:
+            shingles = _shingles(item)
+            # Containment rather than Jaccard, so a chunk fully inside a longer one is caught
+            if any(len(shingles & other) / max(min(len(shingles), len(other)), 1) >= self.duplicate_threshold
+                   for other in kept_shingles):
+                continue
+            kept.append(item)
+            kept_shingles.append(shingles)
+        return kept
+
+    def pack(self, evidence: List[str], turns: List[str], facts: List[str]) -> Dict[str, Any]:
+        evidence = [item for item in evidence if item and item.strip()]
+        unique_evidence = self._deduplicate(evidence)
+        remaining = self.token_budget
+        packed: Dict[str, List[str]] = {}
+        dropped = {"duplicates": len(evidence) - len(unique_evidence)}
+
+        # Newest turns are the most relevant, so they are offered first
+        sections = [("evidence", unique_evidence), ("turns", list(reversed(turns))), ("facts", facts)]
+        for name, items in sections:
+            packed[name], dropped[name] = [], 0
+            for item in items:
+                tokens = len(self.tokenizer(item))
+                if tokens <= remaining:
+                    packed[name].append(item)
+                    remaining -= tokens
+                else:
+                    dropped[name] += 1
+        packed["turns"].reverse()
+
+        return {
+            **packed,
+            "report": {
+                "token_budget": self.token_budget,
+                "tokens_used": self.token_budget - remaining,
+                "dropped": dropped,
+            },
+        }
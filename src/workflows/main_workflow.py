@@ -1,9 +1,30 @@
 from llama_index.core.workflow import (
     Event, StartEvent, StopEvent, Workflow, step, Context
 )
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import logging
+import time
 from llama_index.core.llms import ChatMessage # Add this import
+from llama_index.core.schema import QueryBundle
+from .context_packer import ContextPacker
+from .plan_cache import normalize_query
+from .router import QueryRouter
+from src.utils.config import (
+    FAST_PATH_ENABLED,
+    LATENCY_BUDGET_DEFAULT,
+    DEGRADE_GENERATION_RESERVE,
+    DEGRADE_MIN_PLANNING_TIME,
+    DEGRADE_SUB_QUERY_TIME,
+    DEGRADE_LONG_TERM_MIN_TIME,
+    DEGRADE_REDUCED_K_TIME,
+    DEGRADE_REDUCED_TOP_K,
+    SPECULATIVE_ENABLED,
+    SPECULATIVE_MIN_COVERAGE,
+)
+
+logger = logging.getLogger(__name__)
 
 class ResearchQueryEvent(Event):
     query: str
@@ -17,73 +38,217 @@ class ToolExecutionEvent(Event):
     tool_results: Dict[str, Any]
     query: str
 
+# Events written to the stream for /query/stream clients
+class ProgressEvent(Event):
+    step: str
+    message: str
+
+class SourcesEvent(Event):
+    sources: List[Dict[str, Any]]
+
+class TokenEvent(Event):
+    delta: str
+
 class MainResearchWorkflow(Workflow):
-    """Main workflow orchestrating the research assistant"""
-    def __init__(self, llm, tools, memory_system, query_engines, query_planning_workflow):
+    """Main workflow orchestrating the research assistant.
+
+    One instance serves every request: per-request state (session memory,
+    budgets, flags) is passed to run() and kept in the run's Context.
+    `memory_system` holds the shared long-term memory and flush queue, plus
+    an optional default "short_term" memory for runs that don't pass one.
+    """
+    def __init__(
+        self, llm, tools, memory_system, query_engines, query_planning_workflow,
+        context_packer=None, fast_path: bool = FAST_PATH_ENABLED, speculative: bool = SPECULATIVE_ENABLED,
+        router: Optional[QueryRouter] = None,
+    ):
         super().__init__()
         self.llm = llm
         self.tools = tools
         self.memory_system = memory_system
         self.query_engines = query_engines
         self.query_planning_workflow = query_planning_workflow
+        self.context_packer = context_packer or ContextPacker()
+        self.fast_path = fast_path
+        # Without a trained model the router applies the complexity heuristic
+        self.router = router or QueryRouter(model_path=None, speculative=speculative)
 
-    async def _assess_query_complexity(self, query: str) -> float:
-        import re
-        # More advanced heuristic
-        question_words = ["what", "who", "when", "where", "why", "how", "summarize", "compare"]
-        # Check for multiple question words or conjunctions that often link distinct ideas
-        complex_indicators = re.findall(r'\b(and|or|but|compare|contrast)\b', query.lower())
-        question_indicators = [word for word in question_words if word in query.lower()]
+    async def choose_route(self, query: str) -> str:
+        """'planning' for queries that need decomposition, 'direct' otherwise, and
+        'speculative' for borderline queries where both paths are tried"""
+        return await self.router.choose(query)
 
-        # A more robust scoring system
-        score = 0
-        if len(query.split()) > 20:
-            score += 0.5
-        elif len(query.split()) > 10:
-            score += 0.2
+    async def _planning_kwargs(self, ctx: Context, deadline: Optional[float], remaining: float) -> Dict[str, Any]:
+        """Sub-query cap and deadline for the planning workflow under a latency budget"""
+        if deadline is None:
+            return {}
+        planning_kwargs = {"deadline": deadline - DEGRADE_GENERATION_RESERVE}
+        max_sub_queries = max(1, int(remaining // DEGRADE_SUB_QUERY_TIME))
+        if max_sub_queries < self.query_planning_workflow.max_sub_queries:
+            await self._degrade(ctx, f"max_sub_queries={max_sub_queries}")
+            planning_kwargs["max_sub_queries"] = max_sub_queries
+        return planning_kwargs
+
+    async def _run_direct(self, ctx: Context, query: str, context: Dict[str, Any], remaining: float) -> Dict[str, Any]:
+        fast_path = await ctx.store.get("fast_path", default=self.fast_path)
+        top_k = None
+        if remaining < DEGRADE_REDUCED_K_TIME:
+            # Skip the query engine's own synthesis call and send fewer passages to the LLM
+            if not fast_path:
+                fast_path = True
+                await self._degrade(ctx, "fast_path")
+            top_k = DEGRADE_REDUCED_TOP_K
+            await self._degrade(ctx, f"top_k={top_k}")
+        return await self._execute_direct_query(query, context, fast_path=fast_path, top_k=top_k)
+
+    def _is_sufficient(self, query: str, tool_results: Dict[str, Any]) -> bool:
+        """Cheap check that the direct path found passages covering most of the query's terms"""
+        sources = tool_results.get("sources", [])
+        terms = set(normalize_query(query).split())
+        if not sources or not terms:
+            return False
+        found = set(normalize_query(" ".join(self._collect_evidence(tool_results))).split())
+        return len(terms & found) / len(terms) >= SPECULATIVE_MIN_COVERAGE
+
+    async def _speculate(
+        self, ctx: Context, query: str, context: Dict[str, Any], deadline: Optional[float], remaining: float
+    ) -> Tuple[Dict[str, Any], str]:
+        """Run both paths; keep the direct result if it is sufficient, otherwise wait for the plan"""
+        planning_kwargs = await self._planning_kwargs(ctx, deadline, remaining)
+        planned = asyncio.ensure_future(self.query_planning_workflow.run(query=query, **planning_kwargs))
+        try:
+            try:
+                direct_results = await self._run_direct(ctx, query, context, remaining)
+            except Exception as e:
+                logger.warning("Speculative direct path failed, using the planned path: %s", e)
+                direct_results = None
+            if direct_results is not None and self._is_sufficient(query, direct_results):
+                return direct_results, "speculative_direct"
+            return {"planning_result": str(await planned)}, "speculative_planning"
+        finally:
+            if not planned.done():
+                await self._cancel_branch(planned)
+
+    @staticmethod
+    async def _cancel_branch(pending: asyncio.Future):
+        # A workflow handler only stops its running steps (and their LLM calls) through cancel_run
+        cancel_run = getattr(pending, "cancel_run", None)
+        if cancel_run is not None:
+            await cancel_run()
+        else:
+            pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
 
-        score += len(complex_indicators) * 0.2
-        score += len(question_indicators) * 0.1
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> float:
+        return float("inf") if deadline is None else deadline - time.monotonic()
 
-        # Normalize score to be between 0 and 1
-        normalized_score = min(score / 1.5, 1.0)
+    @staticmethod
+    def _call_timeout(deadline: Optional[float]) -> Optional[float]:
+        """asyncio.wait_for timeout for a call that must finish by the deadline"""
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
 
-        return normalized_score
+    async def _generate(self, ctx: Context, prompt: str, chunks: List[str]) -> str:
+        if await ctx.store.get("stream", default=False):
+            # Forward tokens as they arrive; memory is only updated once generation is done
+            async for chunk in await self.llm.astream_complete(prompt):
+                chunks.append(chunk.delta or "")
+                ctx.write_event_to_stream(TokenEvent(delta=chunk.delta or ""))
+            return "".join(chunks)
+        return str(await self.llm.acomplete(prompt))
 
-    async def _execute_direct_query(self, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
-        # Placeholder for direct query execution
-        # In a real implementation, this would use a query engine to answer the query.
+    async def _degrade(self, ctx: Context, degradation: str):
+        degradations = await ctx.store.get("degradations", default=[])
+        await ctx.store.set("degradations", [*degradations, degradation])
+
+    async def _execute_direct_query(
+        self, query: str, context: Dict[str, Any], fast_path: bool = False, top_k: Optional[int] = None
+    ) -> Dict[str, Any]:
         engine = self.query_engines.get("default")
         if not engine:
             return {"result": "No default query engine available", "sources": []}
         
-        short_term_context = await self.memory_system["short_term"].get_context()
-        augmented_query = f"{short_term_context}\n\nQuery: {query}"
-        result = await engine.aquery(augmented_query)
+        # Conversation history steers the embedding, but keyword and topic matching see only the
+        # question; the final generation step gets the conversation in its prompt either way
+        query_bundle = QueryBundle(query, custom_embedding_strs=[self.retrieval_text(query, context.get('short_term', ''))])
+        if fast_path:
+            # Retrieval only: generate_response makes the single LLM call over these nodes
+            nodes = await engine.aretrieve(query_bundle)
+            return {"sources": nodes[:top_k]}
+        result = await engine.aquery(query_bundle)
         return {
             "result": str(result),
             "sources": getattr(result, 'source_nodes', [])
         }
 
-    def _format_tool_results(self, tool_results: Dict[str, Any]) -> str:
-        formatted_results = []
-        for key, value in tool_results.items():
-            formatted_results.append(f"{key.replace('_', ' ').title()}: {value}")
-        return "\n".join(formatted_results)
+    @staticmethod
+    def format_short_term(messages: List[ChatMessage]) -> str:
+        return "\n".join(f"{m.role}: {m.content}" for m in messages)
+
+    @staticmethod
+    def retrieval_text(query: str, short_term_context: str) -> str:
+        """The text embedded for retrieval; batch callers pre-embed the same string"""
+        return f"{short_term_context}\n\nQuery: {query}"
+
+    def _serialize_sources(self, sources: List[Any]) -> List[Dict[str, Any]]:
+        serialized = []
+        for source in sources:
+            node = getattr(source, "node", source)
+            serialized.append({
+                "node_id": getattr(node, "node_id", None),
+                "score": getattr(source, "score", None),
+                "metadata": getattr(node, "metadata", {}),
+            })
+        return serialized
+
+    def _collect_evidence(self, tool_results: Dict[str, Any]) -> List[str]:
+        """Tool outputs first, then the text of each retrieved source in rank order"""
+        evidence = [
+            f"{key.replace('_', ' ').title()}: {value}"
+            for key, value in tool_results.items() if key != "sources"
+        ]
+        for source in tool_results.get("sources", []):
+            node = getattr(source, "node", source)
+            evidence.append(node.get_content() if hasattr(node, "get_content") else str(node))
+        return evidence
 
     @step
     async def initialize_session(self, ctx: Context, ev: StartEvent) -> ResearchQueryEvent:
         """Initialize session and prepare context"""
         query = ev.query
         user_id = getattr(ev, 'user_id', 'default_user')
+        await ctx.store.set("stream", getattr(ev, 'stream', False))
+        # A per-request fast_path flag overrides the workflow default
+        fast_path = getattr(ev, 'fast_path', None)
+        await ctx.store.set("fast_path", self.fast_path if fast_path is None else fast_path)
+        # Callers that admitted the request already routed it; routing again could disagree with the pool
+        await ctx.store.set("route", getattr(ev, 'route', None))
+        # Steps check the remaining latency budget and degrade rather than overrun it
+        latency_budget = getattr(ev, 'latency_budget', None)
+        if latency_budget is None and LATENCY_BUDGET_DEFAULT > 0:
+            latency_budget = LATENCY_BUDGET_DEFAULT
+        # A budget of zero or less (e.g. spent queueing for admission) is already exhausted,
+        # so every step takes its cheapest path
+        deadline = None if latency_budget is None else time.monotonic() + latency_budget
+        await ctx.store.set("deadline", deadline)
+        await ctx.store.set("degradations", [])
+        ctx.write_event_to_stream(ProgressEvent(step="initialize_session", message="Loading conversation memory"))
 
         # Retrieve relevant memory context
-        short_term_context_messages = await self.memory_system["short_term"].get_context()
-        short_term_context = "\n".join([f"{m.role}: {m.content}" for m in short_term_context_messages])
-        long_term_context = await self.memory_system["long_term"].get_relevant_context(query)
+        # Session memory is per request; the workflow instance is shared across requests
+        short_term_memory = getattr(ev, 'short_term_memory', None) or self.memory_system["short_term"]
+        await ctx.store.set("short_term_memory", short_term_memory)
+        short_term_context_messages = await short_term_memory.get_context()
+        short_term_context = self.format_short_term(short_term_context_messages)
+        if self._remaining(deadline) < DEGRADE_LONG_TERM_MIN_TIME:
+            long_term_context = ""
+            await self._degrade(ctx, "skipped_long_term_memory")
+        else:
+            long_term_context = await self.memory_system["long_term"].get_relevant_context(query)
         context = {
             "user_id": user_id,
             "short_term": short_term_context,
+            "short_term_turns": [f"{m.role}: {m.content}" for m in short_term_context_messages],
             "long_term": long_term_context,
             "timestamp": datetime.now()
         }
@@ -96,15 +261,31 @@ class MainResearchWorkflow(Workflow):
         """Process query using appropriate tools and engines"""
         query = ev.query
         context = ev.context
+        deadline = await ctx.store.get("deadline", default=None)
+        # Time left once the final generation call is set aside
+        remaining = self._remaining(deadline) - DEGRADE_GENERATION_RESERVE
         # Determine if query needs decomposition
-        complexity_score = await self._assess_query_complexity(query)
-        if complexity_score > 0.7:
+        route = await ctx.store.get("route", default=None) or await self.choose_route(query)
+        if route != "direct" and remaining < DEGRADE_MIN_PLANNING_TIME:
+            route = "direct"
+            await self._degrade(ctx, "planning_to_direct")
+        if route == "planning":
             # Use query planning workflow for complex queries
-            planning_result = await self.query_planning_workflow.run(query=query)
+            ctx.write_event_to_stream(ProgressEvent(step="planning", message="Decomposing query into sub-queries"))
+            planning_kwargs = await self._planning_kwargs(ctx, deadline, remaining)
+            planning_result = await self.query_planning_workflow.run(query=query, **planning_kwargs)
             tool_results = {"planning_result": str(planning_result)}
+        elif route == "speculative":
+            ctx.write_event_to_stream(
+                ProgressEvent(step="speculative", message="Running direct and planned retrieval in parallel")
+            )
+            tool_results, route = await self._speculate(ctx, query, context, deadline, remaining)
         else:
             # Direct processing for simple queries
-            tool_results = await self._execute_direct_query(query, ev.context)
+            ctx.write_event_to_stream(ProgressEvent(step="process_query", message="Retrieving relevant passages"))
+            tool_results = await self._run_direct(ctx, query, context, remaining)
+        await ctx.store.set("route", route)
+        ctx.write_event_to_stream(SourcesEvent(sources=self._serialize_sources(tool_results.get("sources", []))))
         return ToolExecutionEvent(tool_results=tool_results, query=query)
 
     @step
@@ -114,33 +295,59 @@ class MainResearchWorkflow(Workflow):
         tool_results = ev.tool_results
         # FIX: Address deprecation warning for ctx.get
         session_context = await ctx.store.get("session_context")
+        # Fit evidence, conversation and background into the token budget
+        packed = self.context_packer.pack(
+            evidence=self._collect_evidence(tool_results),
+            turns=session_context.get('short_term_turns', []),
+            facts=[line for line in (session_context.get('long_term') or '').splitlines() if line.strip()],
+        )
         # Generate response using LLM
+        evidence_text = "\n\n".join(packed["evidence"])
+        turns_text = "\n".join(packed["turns"])
+        facts_text = "\n".join(packed["facts"])
         response_prompt = f"""
 Query: {query}
 Available context and tool results:
-{self._format_tool_results(tool_results)}
+{evidence_text}
 Conversation context:
-{session_context.get('short_term', '')}
+{turns_text}
 Relevant background:
-{session_context.get('long_term', '')}
+{facts_text}
 Provide a comprehensive, helpful response that directly addresses the query.
 """
-        response = await self.llm.acomplete(response_prompt)
-        final_response = str(response)
+        ctx.write_event_to_stream(ProgressEvent(step="generate_response", message="Generating response"))
+        deadline = await ctx.store.get("deadline", default=None)
+        chunks: List[str] = []
+        try:
+            final_response = await asyncio.wait_for(
+                self._generate(ctx, response_prompt, chunks), timeout=self._call_timeout(deadline)
+            )
+        except asyncio.TimeoutError:
+            # Out of time: answer with what retrieval already produced rather than overrun the budget
+            await self._degrade(ctx, "generation_timeout")
+            final_response = "".join(chunks) or (
+                tool_results.get("planning_result") or tool_results.get("result") or "\n\n".join(packed["evidence"])
+            )
         
         # Update short-term memory
-        await self.memory_system["short_term"].add_message("user", query)
-        await self.memory_system["short_term"].add_message("assistant", final_response)
-        
-        # --- FIX: UPDATE LONG-TERM MEMORY ---
-        # This step was missing. It processes the latest conversation turn
-        # and allows the long-term memory blocks (like ResearchContextMemoryBlock) to update.
-        await self.memory_system["long_term"].process_memory_flush(
-            [ChatMessage(role="user", content=query), ChatMessage(role="assistant", content=final_response)]
-        )
+        short_term_memory = await ctx.store.get("short_term_memory")
+        await short_term_memory.add_message("user", query)
+        await short_term_memory.add_message("assistant", final_response)
         
+        # Update long-term memory. With a flush queue the work happens in the
+        # background, batched with other turns, instead of before we respond.
+        turn = [ChatMessage(role="user", content=query), ChatMessage(role="assistant", content=final_response)]
+        flush_queue = self.memory_system.get("flush_queue")
+        if flush_queue is not None:
+            flush_queue.submit(turn)
+        else:
+            await self.memory_system["long_term"].process_memory_flush(turn)
+
         return StopEvent(result={
             "response": final_response,
             "sources": tool_results.get("sources", []),
-            "query": query
+            "query": query,
+            "context": packed["report"],
+            "degradations": await ctx.store.get("degradations", default=[]),
+            "route": await ctx.store.get("route", default=None),
         })
\ No newline at end of file
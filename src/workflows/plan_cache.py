@@ -0,0 +1,139 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from src.utils.caching import LocalTTLCache, corpus_tag, make_cache_key
+from src.utils.semantic_cache import SemanticCache
+from src.utils.config import (
+    PLAN_CACHE_MAX_ENTRIES,
+    PLAN_CACHE_TTL,
+    PLAN_CACHE_SIMILARITY,
+    SUB_QUERY_CACHE_TTL,
+    SUB_QUERY_DEDUP_THRESHOLD,
+)
+
+STOP_WORDS = {"a", "an", "the", "of", "in", "on", "for", "to", "and", "please", "me", "can", "you", "is", "was", "what"}
+# Capitalized only because they open a question, so not names
+OPENING_WORDS = STOP_WORDS | {
+    "how", "why", "when", "where", "which", "who", "did", "does", "do", "are", "were", "has", "have",
+    "compare", "contrast", "summarize", "explain", "describe", "list", "give", "tell", "show",
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and filler words so trivially reworded queries share a key"""
+    tokens = re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", query.lower())
+    return " ".join(token for token in tokens if token not in STOP_WORDS)
+
+
+def query_anchors(query: str) -> str:
+    """Numbers and capitalized names in the query, e.g. "2023 adobe q2".
+
+    Embeddings barely separate "Adobe 2023 revenue" from "Oracle 2022 revenue",
+    so similar plans are only reused between queries with the same anchors.
+    """
+    anchors = {token.rstrip(".") for token in re.findall(r"\w*\d[\w.]*", query.lower())}
+    for word in re.findall(r"[A-Za-z][\w&-]*", query):
+        if word[0].isupper() and len(word) > 1 and word.lower() not in OPENING_WORDS:
+            anchors.add(word.lower())
+    return " ".join(sorted(anchors))
+
+
+def deduplicate_sub_queries(sub_queries: List[str], threshold: float = SUB_QUERY_DEDUP_THRESHOLD) -> List[str]:
+    """Drop sub-queries whose normalized terms overlap an earlier one by at least `threshold` (Jaccard)"""
+    kept, kept_terms = [], []
+    for sub_query in sub_queries:
+        terms = set(normalize_query(sub_query).split())
+        if any(len(terms & other) / max(len(terms | other), 1) >= threshold for other in kept_terms):
+            continue
+        kept.append(sub_query)
+        kept_terms.append(terms)
+    return kept
+
+
+class PlanCache:
+    """Caches the sub-queries produced for a complex query.
+
+    Lookups try the normalized query first and, when an embedding model is
+    given, fall back to the nearest previously planned query above
+    `similarity_threshold` that names the same entities and numbers.
+    """
+    def __init__(
+        self,
+        embed_model=None,
+        max_entries: int = PLAN_CACHE_MAX_ENTRIES,
+        ttl: int = PLAN_CACHE_TTL,
+        similarity_threshold: float = PLAN_CACHE_SIMILARITY,
+    ):
+        self.ttl = ttl
+        self._plans = LocalTTLCache(max_entries=max_entries)
+        self._semantic_index = (
+            SemanticCache(embed_model, threshold=similarity_threshold, max_entries=max_entries)
+            if embed_model is not None else None
+        )
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+
+    async def get(self, query: str) -> Optional[List[str]]:
+        key = normalize_query(query)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self.stats["hits"] += 1
+            return list(plan)
+        if self._semantic_index is not None:
+            similar_key = self._semantic_index.lookup(
+                await self._semantic_index.embed(key), scope=query_anchors(query)
+            )
+            plan = self._plans.get(similar_key) if similar_key else None
+            if plan is not None:
+                self.stats["semantic_hits"] += 1
+                return list(plan)
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, query: str, sub_queries: List[str]):
+        key = normalize_query(query)
+        self._plans.set(key, list(sub_queries), self.ttl)
+        if self._semantic_index is not None:
+            self._semantic_index.add(await self._semantic_index.embed(key), key, scope=query_anchors(query))
+
+    def clear(self):
+        self._plans.clear()
+        if self._semantic_index is not None:
+            self._semantic_index.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = sum(self.stats.values())
+        hits = self.stats["hits"] + self.stats["semantic_hits"]
+        return {**self.stats, "entries": len(self._plans), "hit_rate": hits / lookups if lookups else 0.0}
+
+
+class SubQueryResultCache:
+    """Shares sub-query answers across requests through the response CacheManager.
+
+    Entries are keyed on the normalized sub-query and the live corpus version,
+    and tagged with the corpus so re-ingestion invalidates them.
+    """
+    def __init__(self, cache_manager, ttl: int = SUB_QUERY_CACHE_TTL):
+        self.cache_manager = cache_manager
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _key(self, sub_query: str) -> str:
+        return make_cache_key(normalize_query(sub_query), self.cache_manager.current_corpus_fingerprint, "sub_query")
+
+    async def get(self, sub_query: str) -> Optional[Dict[str, Any]]:
+        cached = await self.cache_manager.get_cached_response(self._key(sub_query), namespace="subquery")
+        self.stats["hits" if cached else "misses"] += 1
+        return cached
+
+    async def put(self, sub_query: str, result: Dict[str, Any]):
+        await self.cache_manager.cache_response(
+            self._key(sub_query),
+            result,
+            ttl=self.ttl,
+            tags=[corpus_tag(self.cache_manager.current_corpus_fingerprint)],
+            namespace="subquery",
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = sum(self.stats.values())
+        return {**self.stats, "hit_rate": self.stats["hits"] / lookups if lookups else 0.0}
@@ -1,12 +1,19 @@
 from llama_index.core.workflow import (
     Event, StartEvent, StopEvent, Workflow, step, Context
 )
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import re
+import time
+from src.utils.config import SUB_QUERY_MAX_CONCURRENCY, SUB_QUERY_TIMEOUT
+from .plan_cache import PlanCache, SubQueryResultCache, deduplicate_sub_queries
 
 class QueryDecompositionEvent(Event):
     query: str
     sub_queries: List[str]
+    # Set by callers with a latency budget
+    max_sub_queries: Optional[int] = None
+    deadline: Optional[float] = None
 
 class SubQueryExecutionEvent(Event):
     sub_query: str
@@ -14,6 +21,7 @@ class SubQueryExecutionEvent(Event):
 
 class SubQueriesExecutedEvent(Event):
     sub_results: List[Dict[str, Any]]
+    deadline: Optional[float] = None
 
 class QuerySynthesisEvent(Event):
     sub_results: List[Dict[str, Any]]
@@ -21,10 +29,29 @@ class QuerySynthesisEvent(Event):
 
 class QueryPlanningWorkflow(Workflow):
     """Intelligent query planning and decomposition workflow"""
-    def __init__(self, llm, query_engines: Dict[str, Any]):
+    # Upper end of the range the planning prompt asks for
+    max_sub_queries = 5
+
+    def __init__(
+        self,
+        llm,
+        query_engines: Dict[str, Any],
+        max_concurrency: int = SUB_QUERY_MAX_CONCURRENCY,
+        sub_query_timeout: Optional[float] = SUB_QUERY_TIMEOUT,
+        plan_cache: Optional[PlanCache] = None,
+        result_cache: Optional[SubQueryResultCache] = None,
+    ):
         super().__init__()
         self.llm = llm
         self.query_engines = query_engines
+        self.max_concurrency = max(1, max_concurrency)
+        self.sub_query_timeout = sub_query_timeout
+        self.plan_cache = plan_cache
+        self.result_cache = result_cache
+
+    @staticmethod
+    def _call_timeout(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
 
     def _extract_sub_queries(self, response: str) -> List[str]:
         # Extract numbered list items as sub-queries
@@ -46,6 +73,13 @@ class QueryPlanningWorkflow(Workflow):
     async def plan_query(self, ctx: Context, ev: StartEvent) -> QueryDecompositionEvent:
         """Decompose complex query into manageable sub-queries"""
         query = ev.query
+        await ctx.store.set("original_query", query)
+        budget = {"max_sub_queries": ev.get("max_sub_queries"), "deadline": ev.get("deadline")}
+        # Analysts repeat the same multi-part questions; reuse an earlier decomposition when we have one
+        if self.plan_cache is not None:
+            sub_queries = await self.plan_cache.get(query)
+            if sub_queries:
+                return QueryDecompositionEvent(query=query, sub_queries=sub_queries, **budget)
         planning_prompt = f"""
 Given this complex query: "{query}"
 Break it down into 3-5 specific sub-questions that can be answered independently.
@@ -55,42 +89,75 @@ Format as a numbered list:
 2. [Sub-question 2]
 ... 
 """
-        response = await self.llm.acomplete(planning_prompt)
+        try:
+            response = await asyncio.wait_for(
+                self.llm.acomplete(planning_prompt), timeout=self._call_timeout(budget["deadline"])
+            )
+        except asyncio.TimeoutError:
+            # No time to plan: answer the question as a single sub-query
+            return QueryDecompositionEvent(query=query, sub_queries=[query], **budget)
         sub_queries = self._extract_sub_queries(str(response))
-        # FIX: Address deprecation warning for ctx.set
-        await ctx.store.set("original_query", query)
-        return QueryDecompositionEvent(query=query, sub_queries=sub_queries)
+        if self.plan_cache is not None and sub_queries:
+            await self.plan_cache.put(query, sub_queries)
+        return QueryDecompositionEvent(query=query, sub_queries=sub_queries, **budget)
 
-    @step
-    async def execute_sub_queries(
-        self, ctx: Context, ev: QueryDecompositionEvent
-    ) -> SubQueriesExecutedEvent:
-        """Execute each sub-query using appropriate tools/engines"""
-        sub_results = []
-        for sub_query in ev.sub_queries:
-            # Determine best engine/tool for this sub-query
-            engine = await self._select_query_engine(sub_query)
-            if not engine:
-                sub_results.append({
-                    "query": sub_query,
-                    "error": "No suitable query engine found",
-                    "result": "Unable to process this sub-query"
-                })
-                continue
+    async def _execute_sub_query(
+        self, sub_query: str, semaphore: asyncio.Semaphore, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Run a single sub-query under the shared concurrency limit and deadline"""
+        # Determine best engine/tool for this sub-query
+        engine = await self._select_query_engine(sub_query)
+        if not engine:
+            return {
+                "query": sub_query,
+                "error": "No suitable query engine found",
+                "result": "Unable to process this sub-query"
+            }
+        if self.result_cache is not None:
+            cached = await self.result_cache.get(sub_query)
+            if cached:
+                return {"query": sub_query, **cached}
+        async with semaphore:
+            timeout = self.sub_query_timeout
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
             try:
-                result = await engine.aquery(sub_query)
-                sub_results.append({
-                    "query": sub_query,
+                result = await asyncio.wait_for(engine.aquery(sub_query), timeout=timeout)
+                sub_result = {
                     "result": str(result),
-                    "sources": getattr(result, 'source_nodes', [])
-                })
+                    # Node ids keep the synthesis prompt small and are what the cache stores
+                    "sources": [node.node.node_id for node in getattr(result, 'source_nodes', [])]
+                }
+                if self.result_cache is not None:
+                    await self.result_cache.put(sub_query, sub_result)
+                return {"query": sub_query, **sub_result}
+            except asyncio.TimeoutError:
+                return {
+                    "query": sub_query,
+                    "error": f"Timed out after {timeout:.1f}s",
+                    "result": "Unable to process this sub-query"
+                }
             except Exception as e:
-                sub_results.append({
+                return {
                     "query": sub_query,
                     "error": str(e),
                     "result": "Unable to process this sub-query"
-                })
-        return SubQueriesExecutedEvent(sub_results=sub_results)
+                }
+
+    @step
+    async def execute_sub_queries(
+        self, ctx: Context, ev: QueryDecompositionEvent
+    ) -> SubQueriesExecutedEvent:
+        """Execute sub-queries concurrently, keeping partial results for synthesis"""
+        # Plans often restate the same question; run each distinct sub-query once
+        sub_queries = deduplicate_sub_queries(ev.sub_queries)[:ev.max_sub_queries]
+        # The semaphore is per run so concurrent planning runs don't share a budget
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        sub_results = await asyncio.gather(
+            *(self._execute_sub_query(sub_query, semaphore, ev.deadline) for sub_query in sub_queries)
+        )
+        return SubQueriesExecutedEvent(sub_results=list(sub_results), deadline=ev.deadline)
 
     @step
     async def synthesize_results(
@@ -116,5 +183,11 @@ Format as a numbered list:
 
     **Final Answer:**
     """
-        final_response = await self.llm.acomplete(synthesis_prompt)
+        try:
+            final_response = await asyncio.wait_for(
+                self.llm.acomplete(synthesis_prompt), timeout=self._call_timeout(ev.deadline)
+            )
+        except asyncio.TimeoutError:
+            # The caller's final generation step can still work from the raw sub-query results
+            return StopEvent(result=self._format_sub_results(ev.sub_results))
         return StopEvent(result=str(final_response))
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""Query routing between the direct and planning paths.
+
+Every answered query is logged with the path that produced it, its latency,
+its LLM token spend and, once the user reacts, whether the answer was
+accepted. ``python -m src.workflows.router`` fits one logistic regression
+per path on lexical and embedding features from that log, predicting the
+chance an answer on that path is accepted. QueryRouter then sends a query
+to the cheapest path whose predicted acceptance clears ROUTER_MIN_ACCEPTANCE.
+Without a trained model, or when a query can't be embedded, it falls back
+to the fixed complexity heuristic.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.utils.config import (
+    ROUTER_TELEMETRY_PATH,
+    ROUTER_MODEL_PATH,
+    ROUTER_MIN_ACCEPTANCE,
+    ROUTER_UNCERTAINTY_MARGIN,
+    ROUTER_MIN_SAMPLES,
+    SPECULATIVE_ENABLED,
+    SPECULATIVE_BAND_LOW,
+    SPECULATIVE_BAND_HIGH,
+)
+
+logger = logging.getLogger(__name__)
+
+PATHS = ("direct", "planning")
+QUESTION_WORDS = ["what", "who", "when", "where", "why", "how", "summarize", "compare"]
+COMPLEX_INDICATORS = re.compile(r'\b(and|or|but|compare|contrast)\b')
+
+
+def heuristic_complexity(query: str) -> float:
+    """Hand-tuned complexity score in [0, 1]"""
+    lowered = query.lower()
+    # Check for multiple question words or conjunctions that often link distinct ideas
+    complex_indicators = COMPLEX_INDICATORS.findall(lowered)
+    question_indicators = [word for word in QUESTION_WORDS if word in lowered]
+
+    score = 0
+    word_count = len(query.split())
+    if word_count > 20:
+        score += 0.5
+    elif word_count > 10:
+        score += 0.2
+
+    score += len(complex_indicators) * 0.2
+    score += len(question_indicators) * 0.1
+
+    # Normalize score to be between 0 and 1
+    return min(score / 1.5, 1.0)
+
+
+def lexical_features(query: str) -> np.ndarray:
+    lowered = query.lower()
+    return np.array([
+        heuristic_complexity(query),
+        len(query.split()) / 25.0,
+        len(COMPLEX_INDICATORS.findall(lowered)),
+        sum(word in lowered for word in QUESTION_WORDS),
+        float(bool(re.search(r"\d", query))),
+    ], dtype=np.float32)
+
+
+def base_path(route: str) -> str:
+    """Speculative runs count towards the path whose answer was returned"""
+    return "planning" if route.endswith("planning") else "direct"
+
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, l2: float = 1.0, iterations: int = 500, learning_rate: float = 0.5):
+    """L2-regularized logistic regression by full-batch gradient descent"""
+    weights = np.zeros(X.shape[1], dtype=np.float64)
+    bias = 0.0
+    for _ in range(iterations):
+        predictions = 1.0 / (1.0 + np.exp(-(X @ weights + bias)))
+        error = predictions - y
+        weights -= learning_rate * (X.T @ error / len(y) + l2 * weights / len(y))
+        bias -= learning_rate * error.mean()
+    return weights, bias
+
+
+class RouteTelemetry:
+    """Append-only JSONL log of routed queries and the feedback they received"""
+    def __init__(self, path: str = ROUTER_TELEMETRY_PATH):
+        self.path = Path(path)
+        self._lock = asyncio.Lock()
+
+    def _append(self, record: Dict[str, Any]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    async def _write(self, record: Dict[str, Any]):
+        async with self._lock:
+            await asyncio.to_thread(self._append, record)
+
+    async def record_route(
+        self, query_id: str, query: str, route: str, latency: float, tokens: int, cached: bool = False
+    ):
+        await self._write({
+            "query_id": query_id, "query": query, "route": route,
+            "latency": round(latency, 3), "tokens": tokens, "cached": cached, "timestamp": time.time(),
+        })
+
+    async def record_feedback(self, query_id: str, accepted: bool):
+        await self._write({"query_id": query_id, "accepted": accepted, "timestamp": time.time()})
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Routed queries joined with their latest feedback; queries without feedback are dropped"""
+        if not self.path.exists():
+            return []
+        routes, feedback = {}, {}
+        with open(self.path) as f:
+            for line in f:
+                record = json.loads(line)
+                if "route" in record:
+                    routes[record["query_id"]] = record
+                else:
+                    feedback[record["query_id"]] = record["accepted"]
+        return [{**record, "accepted": feedback[query_id]} for query_id, record in routes.items() if query_id in feedback]
+
+
+class QueryRouter:
+    def __init__(
+        self,
+        embed_model=None,
+        model_path: Optional[str] = ROUTER_MODEL_PATH,
+        min_acceptance: float = ROUTER_MIN_ACCEPTANCE,
+        uncertainty_margin: float = ROUTER_UNCERTAINTY_MARGIN,
+        speculative: bool = SPECULATIVE_ENABLED,
+    ):
+        self.embed_model = embed_model
+        self.min_acceptance = min_acceptance
+        self.uncertainty_margin = uncertainty_margin
+        self.speculative = speculative
+        self.model: Optional[Dict[str, np.ndarray]] = None
+        if model_path and Path(model_path).exists():
+            self.model = dict(np.load(model_path))
+            logger.info("Loaded router model from %s", model_path)
+        self.stats = {"model": 0, "heuristic": 0}
+
+    def heuristic_route(self, query: str) -> str:
+        complexity_score = heuristic_complexity(query)
+        if self.speculative and SPECULATIVE_BAND_LOW <= complexity_score <= SPECULATIVE_BAND_HIGH:
+            return "speculative"
+        return "planning" if complexity_score > 0.7 else "direct"
+
+    def predict_acceptance(self, features: np.ndarray) -> Dict[str, float]:
+        x = (features - self.model["mean"]) / self.model["std"]
+        return {
+            path: float(1.0 / (1.0 + np.exp(-(x @ self.model[f"{path}_weights"] + self.model[f"{path}_bias"]))))
+            for path in PATHS
+        }
+
+    async def _features(self, query: str) -> Optional[np.ndarray]:
+        if self.embed_model is None:
+            return None
+        try:
+            embedding = np.asarray(await self.embed_model.aget_query_embedding(query), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Router could not embed query, using heuristic: %s", e)
+            return None
+        if embedding.shape[0] + len(lexical_features("")) != self.model["mean"].shape[0]:
+            return None
+        return np.concatenate([lexical_features(query), embedding])
+
+    async def choose(self, query: str) -> str:
+        """'direct', 'planning', or 'speculative' when the model (or heuristic) is unsure"""
+        features = await self._features(query) if self.model is not None else None
+        if features is None:
+            self.stats["heuristic"] += 1
+            return self.heuristic_route(query)
+        self.stats["model"] += 1
+        acceptance = self.predict_acceptance(features)
+        # Paths ordered cheapest first by the token spend seen in training
+        for path in sorted(PATHS, key=lambda p: float(self.model[f"{p}_tokens"])):
+            if acceptance[path] >= self.min_acceptance:
+                if self.speculative and path == "direct" and (
+                    acceptance[path] - self.min_acceptance < self.uncertainty_margin
+                ):
+                    return "speculative"
+                return path
+        return max(PATHS, key=acceptance.get)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "model_loaded": self.model is not None}
+
+
+def train_router(
+    records: List[Dict[str, Any]], embeddings: Iterable[List[float]], min_samples: int = ROUTER_MIN_SAMPLES
+) -> Optional[Dict[str, np.ndarray]]:
+    """Fit per-path acceptance models; None if any path has fewer than `min_samples` labelled queries"""
+    X = np.stack([
+        np.concatenate([lexical_features(record["query"]), np.asarray(embedding, dtype=np.float32)])
+        for record, embedding in zip(records, embeddings)
+    ]) if records else np.empty((0, 0))
+    paths = np.array([base_path(record["route"]) for record in records])
+    for path in PATHS:
+        if (paths == path).sum() < min_samples:
+            logger.warning("Only %d labelled %s queries, need %d", (paths == path).sum(), path, min_samples)
+            return None
+    mean, std = X.mean(axis=0), X.std(axis=0) + 1e-6
+    X = (X - mean) / std
+    accepted = np.array([float(record["accepted"]) for record in records])
+    model = {"mean": mean, "std": std}
+    for path in PATHS:
+        mask = paths == path
+        model[f"{path}_weights"], model[f"{path}_bias"] = fit_logistic(X[mask], accepted[mask])
+        # Cached answers still label acceptance, but cost nothing to serve, so they don't count towards cost
+        costed = [record for record, m in zip(records, mask) if m and not record.get("cached")]
+        costed = costed or [record for record, m in zip(records, mask) if m]
+        model[f"{path}_tokens"] = np.mean([record["tokens"] for record in costed])
+        model[f"{path}_latency"] = np.mean([record["latency"] for record in costed])
+    return model
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Retrain the query router from logged route telemetry")
+    parser.add_argument("--telemetry", default=ROUTER_TELEMETRY_PATH)
+    parser.add_argument("--output", default=ROUTER_MODEL_PATH)
+    parser.add_argument("--min-samples", type=int, default=ROUTER_MIN_SAMPLES)
+    args = parser.parse_args(argv)
+
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from src.utils.config import EMBEDDING_MODEL
+    from src.utils.logging_setup import setup_logging
+
+    setup_logging()
+    records = RouteTelemetry(args.telemetry).load()
+    embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL)
+    embeddings = [embed_model.get_query_embedding(record["query"]) for record in records]
+    model = train_router(records, embeddings, min_samples=args.min_samples)
+    if model is None:
+        logger.info("Not enough labelled telemetry; the router keeps using the heuristic")
+        return
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "wb") as f:
+        np.savez(f, **model)
+    logger.info("Router model trained on %d queries and written to %s", len(records), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from src.app import app as fastapi_app, app_state
+from src.retrieval.ingestion import main as ingest_documents
 import shutil
 import redis
 
@@ -17,6 +18,9 @@ def client():
     except redis.exceptions.ConnectionError as e:
         print(f"\n--- Could not connect to Redis to clear cache: {e} ---")
 
+    # Documents are ingested by the CLI, not at API startup
+    ingest_documents(["--skip-cache-invalidation"])
+
     with TestClient(fastapi_app) as c:
         yield c
         
@@ -41,6 +45,8 @@ def test_end_to_end_workflow_and_memory(client):
     assert len(response1_data["sources"]) > 0
 
     # === Verify Long-Term Memory Update ===
+    # Long-term memory is updated in the background; wait for the queued flush.
+    client.portal.call(app_state["memory_flush_queue"].join)
     long_term_memory = app_state.get("long_term_memory")
     assert long_term_memory is not None
 
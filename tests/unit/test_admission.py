@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+
+from src.utils.admission import AdmissionPool, Overloaded
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_429():
+    pool = AdmissionPool("direct", max_in_flight=1, max_queue=1)
+    ticket = await pool.acquire()
+    waiter = asyncio.create_task(pool.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as excinfo:
+        await pool.acquire()
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after >= 1
+    ticket.release()
+    (await waiter).release()
+    assert pool.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_past_its_deadline_is_shed_with_503():
+    pool = AdmissionPool("planning", max_in_flight=1, max_queue=4)
+    ticket = await pool.acquire()
+
+    with pytest.raises(Overloaded) as excinfo:
+        await pool.acquire(timeout=0.01)
+
+    assert excinfo.value.status_code == 503
+    assert pool.get_stats()["waiting"] == 0
+    ticket.release()
+    assert pool.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_released_slot_goes_to_the_oldest_waiter():
+    pool = AdmissionPool("direct", max_in_flight=1, max_queue=4)
+    ticket = await pool.acquire()
+    order = []
+
+    async def wait(name):
+        admitted = await pool.acquire()
+        order.append(name)
+        admitted.release()
+
+    waiters = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+    await asyncio.sleep(0)
+    ticket.release()
+    # Releasing twice must not free a second slot
+    ticket.release()
+    await asyncio.gather(*waiters)
+
+    assert order == ["first", "second"]
+    assert pool.get_stats()["in_flight"] == 0
+    assert pool.get_stats()["admitted"] == 3
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+pytest.importorskip("llama_index.embeddings.huggingface")
+
+from src import app as app_module
+from src.app import BatchQueryRequest, QueryRequest, _answer_query, batch_query
+from src.utils.admission import AdmissionPool
+from src.utils.semantic_cache import SemanticCache
+from src.utils.single_flight import SingleFlight
+from src.workflows.router import RouteTelemetry
+
+
+class InMemoryCacheManager:
+    current_corpus_fingerprint = "corpus-v1"
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get_cached_response(self, query_hash, namespace="response"):
+        return self.entries.get(f"{namespace}:{query_hash}")
+
+    async def cache_response(self, query_hash, response, ttl=0, tags=(), namespace="response"):
+        self.entries[f"{namespace}:{query_hash}"] = response
+
+
+@pytest.fixture
+def app_state(tmp_path, monkeypatch):
+    semantic_cache = Mock()
+    semantic_cache.lookup.return_value = None
+
+    async def embed(query):
+        return None
+
+    semantic_cache.embed = embed
+
+    async def answer():
+        await asyncio.sleep(0.01)
+        return {"response": "Revenue was $5.87 billion.", "route": "direct", "degradations": []}
+
+    main_workflow = Mock()
+    main_workflow.run = Mock(side_effect=lambda **kwargs: asyncio.ensure_future(answer()))
+    state = {
+        "cache_manager": InMemoryCacheManager(),
+        "semantic_cache": semantic_cache,
+        "single_flight": SingleFlight(),
+        "main_workflow": main_workflow,
+        "session_store": Mock(),
+        "route_telemetry": RouteTelemetry(str(tmp_path / "routes.jsonl")),
+    }
+    monkeypatch.setattr(app_module, "app_state", state)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_each_caller_gets_its_own_query_id(app_state):
+    request = QueryRequest(query="What was Q2 revenue?", session_id="s1")
+
+    # Two coalesced callers, then a cache hit
+    (first, _), (second, _) = await asyncio.gather(_answer_query(request), _answer_query(request))
+    third, cached = await _answer_query(request)
+
+    assert app_state["main_workflow"].run.call_count == 1
+    assert cached
+    assert len({first["query_id"], second["query_id"], third["query_id"]}) == 3
+    # The shared (cached) result never carries a caller's id
+    assert all("query_id" not in entry for entry in app_state["cache_manager"].entries.values())
+    await app_state["route_telemetry"].record_feedback(second["query_id"], True)
+    labelled = app_state["route_telemetry"].load()
+    assert [record["query_id"] for record in labelled] == [second["query_id"]]
+
+
+@pytest.mark.asyncio
+async def test_workflow_limit_bounds_whole_runs(app_state):
+    running, peak = 0, 0
+
+    async def answer():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"response": "ok", "route": "direct", "degradations": []}
+
+    app_state["main_workflow"].run = Mock(side_effect=lambda **kwargs: asyncio.ensure_future(answer()))
+    limit = asyncio.Semaphore(2)
+    requests = [QueryRequest(query=f"What was revenue in Q{i}?", session_id="s1") for i in range(1, 5)]
+    await asyncio.gather(*(_answer_query(request, limit) for request in requests))
+
+    assert app_state["main_workflow"].run.call_count == 4
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_admitted_route_is_passed_to_the_workflow(app_state):
+    ticket = Mock()
+
+    async def admit(request):
+        return ticket, 5.0, "planning"
+
+    app_state["main_workflow"].choose_route = Mock()
+    with patch.object(app_module, "_admit", admit):
+        await _answer_query(QueryRequest(query="What was Q2 revenue?", session_id="s1"), admit=True)
+
+    app_state["main_workflow"].choose_route.assert_not_called()
+    kwargs = app_state["main_workflow"].run.call_args.kwargs
+    assert kwargs["route"] == "planning"
+    assert kwargs["latency_budget"] == 5.0
+    ticket.release.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_semantic_hits_need_the_same_year(app_state):
+    # Every question embeds identically, so only the anchors in the scope tell them apart
+    embed_model = Mock()
+    embed_model.aget_query_embedding = AsyncMock(return_value=[1.0, 0.0])
+    app_state["semantic_cache"] = SemanticCache(embed_model=embed_model)
+
+    await _answer_query(QueryRequest(query="What was Adobe revenue in 2023?", session_id="s1"))
+    _, reworded_cached = await _answer_query(QueryRequest(query="How much revenue did Adobe make in 2023?", session_id="s1"))
+    _, other_year_cached = await _answer_query(QueryRequest(query="What was Adobe revenue in 2024?", session_id="s1"))
+
+    assert reworded_cached
+    assert not other_year_cached
+    assert app_state["main_workflow"].run.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_reads_each_session_history_once(app_state):
+    memories = {"s1": Mock(), "s2": Mock()}
+    for session_id, memory in memories.items():
+        memory.get_context = AsyncMock(return_value=[Mock(role="user", content=f"Earlier in {session_id}.")])
+    app_state["session_store"].get = Mock(side_effect=lambda session_id: memories[session_id])
+    app_state["embed_model"] = Mock(aget_query_embeddings=AsyncMock())
+    app_state["admission"] = {"direct": AdmissionPool("direct", 4, 4), "planning": AdmissionPool("planning", 4, 4)}
+    app_state["main_workflow"].choose_route = AsyncMock(return_value="direct")
+    batch = BatchQueryRequest(queries=[
+        QueryRequest(query=f"What was revenue in Q{i}?", session_id=f"s{i % 2 + 1}") for i in range(1, 5)
+    ])
+
+    response = await batch_query(batch)
+    lines = [json.loads(line) async for line in response.body_iterator]
+
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert all(memory.get_context.await_count == 1 for memory in memories.values())
+    texts = app_state["embed_model"].aget_query_embeddings.await_args.args[0]
+    assert "user: Earlier in s2.\n\nQuery: What was revenue in Q1?" in texts
+    assert len(texts) == 8
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from redis.exceptions import ConnectionError as RedisConnectionError
+from src.utils.caching import CacheManager, LocalTTLCache, make_cache_key, corpus_tag
+
+
+@pytest.fixture
+def cache_manager():
+    """
+    Fixture that provides a CacheManager whose Redis client is mocked out,
+    so no Redis server is needed.
+    """
+    manager = CacheManager(local_max_entries=2)
+    manager.redis_client = AsyncMock()
+    manager.redis_client.get.return_value = None
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    manager.redis_client.pipeline = MagicMock()
+    manager.redis_client.pipeline.return_value.__aenter__.return_value = pipe
+    manager.redis_pipe = pipe
+    return manager
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalTTLCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_local_cache_expires_entries():
+    cache = LocalTTLCache()
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_local_hit_skips_redis(cache_manager):
+    await cache_manager.cache_response("hash", {"response": "cached"})
+    result = await cache_manager.get_cached_response("hash")
+
+    assert result == {"response": "cached"}
+    cache_manager.redis_pipe.setex.assert_called_once()
+    cache_manager.redis_pipe.execute.assert_awaited_once()
+    cache_manager.redis_client.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_degrades_to_local_tier(cache_manager):
+    cache_manager.redis_client.get.side_effect = RedisConnectionError("down")
+
+    assert await cache_manager.get_cached_response("missing") is None
+    assert not cache_manager.redis_available
+
+    # While Redis is marked down, writes still land in the local tier.
+    await cache_manager.cache_response("hash", {"response": "cached"})
+    assert await cache_manager.get_cached_response("hash") == {"response": "cached"}
+    cache_manager.redis_client.pipeline.assert_not_called()
+    assert cache_manager.redis_client.get.call_count == 1
+
+
+def test_cache_key_depends_on_corpus_and_scope():
+    key = make_cache_key("What was Adobe's Q2 revenue?", "corpus_a", "session_1")
+
+    assert key == make_cache_key("What was Adobe's Q2 revenue?", "corpus_a", "session_1")
+    assert key != make_cache_key("What was Adobe's Q2 revenue?", "corpus_b", "session_1")
+    assert key != make_cache_key("What was Adobe's Q2 revenue?", "corpus_a", "session_2")
+
+
+@pytest.mark.asyncio
+async def test_corpus_change_invalidates_only_that_corpus(cache_manager):
+    cache_manager._mark_redis_down()
+    await cache_manager.set_corpus_fingerprint("corpus_a")
+    await cache_manager.cache_response("old", {"response": "stale"}, tags=[corpus_tag("corpus_a")])
+    await cache_manager.cache_response("other", {"response": "kept"}, tags=[corpus_tag("corpus_b")])
+
+    await cache_manager.set_corpus_fingerprint("corpus_b")
+
+    assert await cache_manager.get_cached_response("old") is None
+    assert await cache_manager.get_cached_response("other") == {"response": "kept"}
+    assert cache_manager.current_corpus_fingerprint == "corpus_b"
+
+
+@pytest.mark.asyncio
+async def test_corpus_changed_by_another_process_clears_local_tier(cache_manager):
+    await cache_manager.set_corpus_fingerprint("corpus_a")
+    await cache_manager.cache_response("old", {"response": "stale"}, tags=[corpus_tag("corpus_a")])
+    # The ingestion CLI has already written the new version to Redis
+    cache_manager.redis_client.getset.return_value = b"corpus_b"
+    cache_manager.redis_client.smembers.return_value = set()
+
+    await cache_manager.set_corpus_fingerprint("corpus_b")
+
+    assert cache_manager.local_cache.get("response:old") is None
+    assert cache_manager.current_corpus_fingerprint == "corpus_b"
@@ -0,0 +1,39 @@
+from src.workflows.context_packer import ContextPacker
+
+
+def _word_tokenizer(text):
+    return text.split()
+
+
+def test_fills_budget_by_priority_and_reports_drops():
+    packer = ContextPacker(token_budget=10, tokenizer=_word_tokenizer)
+
+    packed = packer.pack(
+        evidence=["revenue was 5.87 billion", "shares repurchased 8.6 million"],
+        turns=["user: an old question", "user: the latest question"],
+        facts=["Current research topics: adobe"],
+    )
+
+    assert packed["evidence"] == ["revenue was 5.87 billion", "shares repurchased 8.6 million"]
+    # Evidence takes 8 of the 10 tokens; neither turn nor the fact fits in the last 2.
+    assert packed["turns"] == []
+    assert packed["report"]["tokens_used"] == 8
+    assert packed["report"]["dropped"] == {"duplicates": 0, "evidence": 0, "turns": 2, "facts": 1}
+
+
+def test_newest_turns_are_kept_first_and_stay_in_order():
+    packer = ContextPacker(token_budget=6, tokenizer=_word_tokenizer)
+
+    packed = packer.pack(evidence=[], turns=["user: first turn", "user: second turn", "user: third turn"], facts=[])
+
+    assert packed["turns"] == ["user: second turn", "user: third turn"]
+
+
+def test_overlapping_chunks_are_deduplicated():
+    packer = ContextPacker(token_budget=100, tokenizer=_word_tokenizer)
+    chunk = "Adobe achieved record revenue of 5.87 billion in its second quarter of fiscal 2025"
+
+    packed = packer.pack(evidence=[chunk, chunk + " driven by Digital Media", "an unrelated passage"], turns=[], facts=[])
+
+    assert packed["evidence"] == [chunk, "an unrelated passage"]
+    assert packed["report"]["dropped"]["duplicates"] == 1
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from llama_index.core import MockEmbedding
+from src.utils.embedding_service import SharedEmbedding
+
+
+class CountingEmbedding(MockEmbedding):
+    """MockEmbedding that records every batch it is asked to encode."""
+    batches: list = []
+
+    def _get_query_embedding(self, query):
+        self.batches.append([query])
+        return [float(len(query))] * self.embed_dim
+
+    def _get_text_embeddings(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] * self.embed_dim for text in texts]
+
+
+@pytest.fixture
+def inner():
+    return CountingEmbedding(embed_dim=4, batches=[])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_micro_batched(inner):
+    embedding = SharedEmbedding(inner, max_batch_size=8, batch_window=0.01)
+
+    vectors = await asyncio.gather(*(embedding.aget_text_embedding(f"chunk {i}") for i in range(5)))
+
+    assert len(inner.batches) == 1
+    assert len(inner.batches[0]) == 5
+    assert vectors[3] == [7.0] * 4
+
+
+@pytest.mark.asyncio
+async def test_repeated_text_is_served_from_cache(inner):
+    embedding = SharedEmbedding(inner, batch_window=0)
+
+    first = await embedding.aget_query_embedding("Adobe Q2 revenue")
+    second = await embedding.aget_query_embedding("Adobe Q2 revenue")
+    embedding.get_query_embedding("Adobe Q2 revenue")
+
+    assert first == second
+    assert len(inner.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_in_flight_requests_share_one_slot(inner):
+    embedding = SharedEmbedding(inner, batch_window=0.01)
+
+    await asyncio.gather(*(embedding.aget_text_embedding("same text") for _ in range(3)))
+
+    assert inner.batches == [["same text"]]
+
+
+@pytest.mark.asyncio
+async def test_query_batch_warms_cache_for_later_lookups(inner):
+    embedding = SharedEmbedding(inner, batch_window=0)
+
+    await embedding.aget_query_embeddings(["first question", "second question"])
+    calls = len(inner.batches)
+    vector = await embedding.aget_query_embedding("second question")
+
+    assert len(inner.batches) == calls
+    assert vector == [15.0] * 4
@@ -0,0 +1,83 @@
+import pytest
+from unittest.mock import Mock, AsyncMock
+from llama_index.core.schema import NodeWithScore, TextNode
+from src.retrieval.bm25 import BM25Index, tokenize
+from src.retrieval.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from src.retrieval.keyphrase_index import KeyphraseIndex
+
+
+@pytest.fixture
+def bm25_index():
+    index = BM25Index()
+    index.add("revenue", "Total revenue was $5.87 billion, up 11 percent year over year.")
+    index.add("buyback", "Adobe repurchased approximately 8.6 million shares during the quarter.")
+    index.add("arr", "Digital Media ending ARR grew to $18.09 billion.")
+    return index
+
+
+def test_tokenize_keeps_figures_together():
+    assert tokenize("Revenue of $18.09 billion and 5,875 units") == ["revenue", "of", "18.09", "billion", "and", "5,875", "units"]
+
+
+def test_bm25_ranks_exact_figures_first(bm25_index):
+    results = bm25_index.search("How many shares, 8.6 million?", top_k=2)
+    assert results[0][0] == "buyback"
+
+
+def test_bm25_persistence_and_removal(bm25_index, tmp_path):
+    bm25_index.save(str(tmp_path / "bm25.json"))
+    loaded = BM25Index.load(str(tmp_path / "bm25.json"))
+    assert loaded.search("18.09")[0][0] == "arr"
+
+    loaded.remove("arr")
+    assert loaded.search("18.09") == []
+    assert len(loaded) == 2
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert fused[0][0] == "b"
+    assert {node_id for node_id, _ in fused} == {"a", "b", "c", "d"}
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retriever_fetches_keyword_only_hits(bm25_index):
+    vector_retriever = Mock()
+    vector_retriever.aretrieve = AsyncMock(return_value=[
+        NodeWithScore(node=TextNode(id_="revenue", text="Total revenue was $5.87 billion."), score=0.8),
+    ])
+    vector_store = Mock()
+    vector_store.get_nodes.return_value = [TextNode(id_="arr", text="Digital Media ending ARR grew to $18.09 billion.")]
+    retriever = HybridRetriever(vector_retriever, bm25_index, vector_store, top_k=2)
+
+    results = await retriever.aretrieve("Digital Media ARR of $18.09 billion")
+
+    # Each is first in one ranking, so both make the fused top 2.
+    assert {r.node.node_id for r in results} == {"arr", "revenue"}
+    vector_store.get_nodes.assert_called_once_with(node_ids=["arr"])
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retriever_boosts_topic_matches_without_dropping_others(bm25_index):
+    keyphrase_index = KeyphraseIndex()
+    keyphrase_index.add("arr", ["digital media", "ARR"], "report.pdf p. 4")
+    keyphrase_index.add("buyback", ["share repurchase"], "report.pdf p. 9")
+    vector_hits = [
+        NodeWithScore(node=TextNode(id_="buyback", text="Adobe repurchased 8.6 million shares."), score=0.9),
+        NodeWithScore(node=TextNode(id_="revenue", text="Total revenue was $5.87 billion."), score=0.8),
+        NodeWithScore(node=TextNode(id_="arr", text="Digital Media ending ARR grew to $18.09 billion."), score=0.7),
+    ]
+    vector_retriever = Mock()
+    vector_retriever.aretrieve = AsyncMock(return_value=vector_hits)
+    query = "How did Digital Media grow, and what was total revenue of $5.87 billion?"
+    plain = HybridRetriever(vector_retriever, bm25_index, Mock(), top_k=3)
+    boosted = HybridRetriever(vector_retriever, bm25_index, Mock(), top_k=3, keyphrase_index=keyphrase_index)
+
+    plain_results = await plain.aretrieve(query)
+    boosted_results = await boosted.aretrieve(query)
+
+    # The on-topic chunk moves up; the exact-figure chunk found only by BM25 and vector search stays
+    plain_ids = [r.node.node_id for r in plain_results]
+    boosted_ids = [r.node.node_id for r in boosted_results]
+    assert boosted_ids.index("arr") < plain_ids.index("arr")
+    assert set(boosted_ids) == set(plain_ids) == {"arr", "revenue", "buyback"}
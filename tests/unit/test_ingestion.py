@@ -0,0 +1,148 @@
+import subprocess
+import sys
+
+import chromadb
+import pytest
+from llama_index.core import MockEmbedding
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from src.retrieval.ingestion import IncrementalIngestionPipeline, IngestionManifest
+from src.retrieval.bm25 import BM25Index
+from src.retrieval.keyphrase_index import KeyphraseIndex
+from src.retrieval.retrievers import (
+    create_vector_store, get_corpus_fingerprint, reopen_vector_store, set_corpus_fingerprint
+)
+
+
+@pytest.fixture
+def vector_store():
+    collection = chromadb.EphemeralClient().create_collection("test-ingestion")
+    yield ChromaVectorStore(chroma_collection=collection)
+    chromadb.EphemeralClient().delete_collection("test-ingestion")
+
+
+def _run(vector_store, tmp_path):
+    embed_model = MockEmbedding(embed_dim=8)
+    pipeline = IncrementalIngestionPipeline(
+        vector_store,
+        IngestionManifest(str(tmp_path / "manifest.json")),
+        embed_model=embed_model,
+        bm25_index_path=str(tmp_path / "bm25.json"),
+        keyphrase_index_path=str(tmp_path / "keyphrases.json"),
+        data_dir=tmp_path / "docs",
+    )
+    return pipeline.run()
+
+
+def test_only_changed_and_deleted_files_are_processed(vector_store, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "revenue.txt").write_text("Adobe reported total revenue of $5.87 billion in Q2.")
+    (docs / "buyback.txt").write_text("Adobe repurchased 8.6 million shares in the quarter.")
+
+    first = _run(vector_store, tmp_path)
+    assert first["files_ingested"] == 2
+    assert vector_store._collection.count() == 2
+    first_fingerprint = get_corpus_fingerprint(vector_store)
+
+    # Re-running with no changes embeds nothing.
+    second = _run(vector_store, tmp_path)
+    assert second == {"files_unchanged": 2, "chunks_backfilled": 0}
+
+    (docs / "revenue.txt").write_text("Adobe reported total revenue of $5.9 billion in Q2.")
+    (docs / "buyback.txt").unlink()
+    third = _run(vector_store, tmp_path)
+
+    assert third["files_ingested"] == 1
+    assert third["files_deleted"] == 1
+    assert third["chunks_embedded"] == 1
+    assert third["chunks_deleted"] == 2
+    assert vector_store._collection.count() == 1
+    assert get_corpus_fingerprint(vector_store) != first_fingerprint
+
+    bm25_index = BM25Index.load(str(tmp_path / "bm25.json"))
+    assert len(bm25_index) == 1
+    assert bm25_index.search("8.6 million shares") == []
+    assert len(bm25_index.search("$5.9 billion")) == 1
+
+    keyphrase_index = KeyphraseIndex.load(str(tmp_path / "keyphrases.json"))
+    assert len(keyphrase_index) == 1
+    assert keyphrase_index.match("shares repurchased") == {}
+
+
+def test_chunks_are_tagged_with_keyphrases(vector_store, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "arr.txt").write_text("Digital Media ending ARR grew to $18.09 billion, driven by Creative Cloud subscriptions.")
+
+    _run(vector_store, tmp_path)
+
+    stored = vector_store._collection.get(include=["metadatas", "documents"])
+    assert "Digital Media" in stored["metadatas"][0]["keyphrases"]
+    # Keyphrases stay out of the embedded text
+    assert "keyphrases" not in vector_store.get_nodes(node_ids=stored["ids"])[0].get_content(metadata_mode="embed")
+    keyphrase_index = KeyphraseIndex.load(str(tmp_path / "keyphrases.json"))
+    assert [region for region, _ in keyphrase_index.top_regions(["digital media growth"])] == ["arr.txt"]
+
+    # A lost index is rebuilt from the stored chunks without re-embedding them
+    (tmp_path / "keyphrases.json").unlink()
+    rerun = _run(vector_store, tmp_path)
+    assert rerun["chunks_backfilled"] == 1
+    assert set(KeyphraseIndex.load(str(tmp_path / "keyphrases.json")).match("digital media")) == set(stored["ids"])
+
+
+def test_pdf_pages_are_parsed_in_parallel_page_ranges(vector_store, tmp_path):
+    import pymupdf
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    pdf = pymupdf.open()
+    for text in ["Digital Media revenue grew.", "Digital Experience revenue grew.", "Shares were repurchased."]:
+        pdf.new_page().insert_text((72, 72), text)
+    pdf.save(docs / "report.pdf")
+
+    pipeline = IncrementalIngestionPipeline(
+        vector_store,
+        IngestionManifest(str(tmp_path / "manifest.json")),
+        embed_model=MockEmbedding(embed_dim=8),
+        bm25_index_path=str(tmp_path / "bm25.json"),
+        keyphrase_index_path=str(tmp_path / "keyphrases.json"),
+        data_dir=docs,
+        workers=2,
+        pages_per_task=1,
+        embed_batch_size=2,
+    )
+    stats = pipeline.run()
+
+    assert stats["chunks_embedded"] == 3
+    stored = vector_store._collection.get(include=["metadatas"])
+    assert sorted(m["page_label"] for m in stored["metadatas"]) == ["1", "2", "3"]
+
+
+def test_fingerprint_written_through_another_handle_is_seen(vector_store):
+    # A server's collection handle must notice a fingerprint the ingestion CLI wrote
+    other = ChromaVectorStore(chroma_collection=chromadb.EphemeralClient().get_collection("test-ingestion"))
+    assert get_corpus_fingerprint(vector_store) == "unversioned"
+
+    set_corpus_fingerprint(other, "corpus-v2")
+
+    assert get_corpus_fingerprint(vector_store) == "corpus-v2"
+
+
+def test_reopened_store_serves_vectors_another_process_wrote(tmp_path):
+    path = str(tmp_path / "chroma")
+    store = create_vector_store(path, "reopen-test")
+    store._collection.add(ids=["old"], embeddings=[[1.0, 0.0]], documents=["Old chunk."])
+    assert store._collection.query(query_embeddings=[[1.0, 0.0]], n_results=1)["ids"] == [["old"]]
+
+    # What the ingestion CLI does to a running server's collection
+    subprocess.run([sys.executable, "-c", (
+        "import chromadb\n"
+        f"collection = chromadb.PersistentClient(path={path!r}).get_collection('reopen-test')\n"
+        "collection.delete(ids=['old'])\n"
+        "collection.add(ids=['new'], embeddings=[[1.0, 0.1]], documents=['New chunk.'])\n"
+    )], check=True)
+
+    reopened = reopen_vector_store(path, "reopen-test")
+    result = reopened._collection.query(query_embeddings=[[1.0, 0.0]], n_results=1, include=["documents"])
+    assert result["ids"] == [["new"]]
+    assert result["documents"] == [["New chunk."]]
@@ -0,0 +1,55 @@
+import pytest
+from src.memory.memory_blocks import ResearchContextMemoryBlock
+from src.retrieval.keyphrase_index import KeyphraseIndex, region_label
+
+
+@pytest.fixture
+def keyphrase_index():
+    index = KeyphraseIndex()
+    index.add("dm-revenue", ["Digital Media revenue", "creative cloud", "ARR"], "report.pdf p. 4")
+    index.add("dx-revenue", ["Digital Experience", "revenue"], "report.pdf p. 5")
+    index.add("buyback", ["share repurchase", "shares"], "report.pdf p. 9")
+    return index
+
+
+def test_region_label():
+    assert region_label({"file_name": "report.pdf", "page_label": "12"}) == "report.pdf p. 12"
+    assert region_label({"file_name": "notes.txt"}) == "notes.txt"
+
+
+def test_match_requires_every_word_of_a_keyphrase(keyphrase_index):
+    matches = keyphrase_index.match("How did Digital Media revenue and ARR grow?")
+    assert set(matches) == {"dm-revenue", "dx-revenue"}
+    # The chunk tagged with the full phrase outranks one tagged with "revenue" alone
+    assert matches["dm-revenue"] > matches["dx-revenue"]
+    assert keyphrase_index.match("creative tools") == {}
+
+
+def test_top_regions_for_topics(keyphrase_index):
+    regions = keyphrase_index.top_regions(["share repurchase program", "shares outstanding"], top_k=2)
+    assert [region for region, _ in regions] == ["report.pdf p. 9"]
+
+
+def test_persistence_and_removal(keyphrase_index, tmp_path):
+    keyphrase_index.save(str(tmp_path / "keyphrases.json"))
+    loaded = KeyphraseIndex.load(str(tmp_path / "keyphrases.json"))
+    assert set(loaded.match("digital media revenue")) == {"dm-revenue", "dx-revenue"}
+
+    loaded.remove_many(["dm-revenue", "missing"])
+    assert set(loaded.match("digital media revenue")) == {"dx-revenue"}
+    assert loaded.matching_phrases("creative cloud") == []
+    assert len(loaded) == 2
+
+    # Reloading in place keeps other holders of the index object up to date
+    loaded.reload(str(tmp_path / "keyphrases.json"))
+    assert set(loaded.match("digital media revenue")) == {"dm-revenue", "dx-revenue"}
+
+
+@pytest.mark.asyncio
+async def test_research_context_maps_topics_to_document_regions(keyphrase_index):
+    block = ResearchContextMemoryBlock(keyphrase_index=keyphrase_index)
+    block.research_topics = {"topics": ["Digital Media revenue growth", "ARR"]}
+
+    context = await block._aget()
+
+    assert "Relevant document sections: report.pdf p. 4, report.pdf p. 5" in context
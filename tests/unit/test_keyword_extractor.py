@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from src.tools.keyword_extractor import KeywordExtractionTool
 from unittest.mock import MagicMock
@@ -49,4 +50,50 @@ def test_comprehensive_keyword_extraction(keyword_extractor):
     assert len(results["keybert"]) > 0
     
     # Check that our mocked KeyBERT was called
-    keyword_extractor.keybert_extractor.extract_keywords.assert_called_once()
\ No newline at end of file
+    keyword_extractor.keybert_extractor.extract_keywords.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_yake_matches_sync_and_keeps_order():
+    """
+    Tests that the pooled YAKE variants return the same keywords as the sync method, in input order.
+    """
+    extractor = KeywordExtractionTool(workers=1, task_size=2)
+    texts = [
+        "Renewable energy sources include solar, wind, and hydroelectric power.",
+        "The cat sat on the mat.",
+        "",
+        "This is a test.",
+    ]
+    try:
+        single = await extractor.aextract_keywords_yake(texts[0])
+        batch = await extractor.aextract_keywords_yake_batch(texts)
+    finally:
+        extractor.close()
+
+    assert single == extractor.extract_keywords_yake(texts[0])
+    assert batch == [extractor.extract_keywords_yake(text) for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_keybert_calls_are_micro_batched():
+    """
+    Tests that concurrent KeyBERT requests share one embedding pass and empty texts are skipped.
+    """
+    extractor = KeywordExtractionTool(keybert_batch_size=3, keybert_batch_window=1)
+    extractor.keybert_extractor = MagicMock()
+    extractor.keybert_extractor.extract_embeddings.return_value = ("doc embeddings", "word embeddings")
+    extractor.keybert_extractor.extract_keywords.return_value = [[("first", 0.9)], [("second", 0.8)]]
+    try:
+        results = await asyncio.gather(
+            extractor.aextract_keywords_bert("first text"),
+            extractor.aextract_keywords_bert(""),
+            extractor.aextract_keywords_bert("second text"),
+        )
+    finally:
+        extractor.close()
+
+    assert results == [[("first", 0.9)], [], [("second", 0.8)]]
+    extractor.keybert_extractor.extract_embeddings.assert_called_once()
+    assert extractor.keybert_extractor.extract_keywords.call_args.args[0] == ["first text", "second text"]
+    assert extractor.keybert_extractor.extract_keywords.call_args.kwargs["doc_embeddings"] == "doc embeddings"
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import time
+import pytest
+from types import SimpleNamespace
+
+from src.utils.llm_dispatcher import (
+    LLMDispatcher, Priority, create_groq_llm, create_http_client, track_llm_usage
+)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "0"})
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_are_served_before_background_calls():
+    dispatcher = LLMDispatcher(max_concurrency=1, completion_tokens=0)
+    release = asyncio.Event()
+    order = []
+
+    async def blocking():
+        await release.wait()
+
+    async def record(name):
+        order.append(name)
+
+    first = asyncio.create_task(dispatcher.call(blocking))
+    await asyncio.sleep(0)
+    background = asyncio.create_task(dispatcher.call(lambda: record("background"), Priority.BACKGROUND))
+    interactive = asyncio.create_task(dispatcher.call(lambda: record("interactive"), Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+    assert dispatcher.get_stats()["queued"] == 2
+    release.set()
+    await asyncio.gather(first, background, interactive)
+
+    assert order == ["interactive", "background"]
+
+
+@pytest.mark.asyncio
+async def test_calls_wait_for_the_token_bucket_to_refill():
+    # 600 tokens per minute refills 10 tokens per second
+    dispatcher = LLMDispatcher(tokens_per_minute=600, completion_tokens=0)
+
+    async def noop():
+        return None
+
+    await dispatcher.call(noop, prompt_tokens=600)
+    start = time.monotonic()
+    await dispatcher.call(noop, prompt_tokens=5)
+
+    assert time.monotonic() - start >= 0.4
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried():
+    dispatcher = LLMDispatcher(completion_tokens=0, retry_base_delay=0.001)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise RateLimitError()
+        return "ok"
+
+    assert await dispatcher.call(flaky) == "ok"
+    stats = dispatcher.get_stats()
+    assert stats["retries"] == 2
+    assert stats["rate_limited"] == 2
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_fail_immediately():
+    dispatcher = LLMDispatcher(completion_tokens=0)
+    attempts = 0
+
+    async def broken():
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await dispatcher.call(broken)
+    assert attempts == 1
+    assert dispatcher.get_stats()["failures"] == 1
+
+
+COMPLETION = {
+    "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "stub answer"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+}
+
+
+async def _start_stub_server(responses, connections):
+    """Minimal keep-alive HTTP server replaying (status, body) pairs for each request"""
+    async def handle(reader, writer):
+        connections.append(writer)
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            length = next(
+                (int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")),
+                0,
+            )
+            await reader.readexactly(length)
+            status, body = responses.pop(0)
+            payload = json.dumps(body).encode()
+            writer.write(
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Retry-After: 0\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+@pytest.mark.asyncio
+async def test_groq_llm_against_stub_server_retries_and_reuses_connection():
+    pytest.importorskip("llama_index.llms.groq")
+    connections = []
+    responses = [(429, {"error": {"message": "rate limited"}}), (200, COMPLETION), (200, COMPLETION)]
+    server = await _start_stub_server(responses, connections)
+    port = server.sockets[0].getsockname()[1]
+    http_client = create_http_client()
+    dispatcher = LLMDispatcher(tokens_per_minute=1_000_000, retry_base_delay=0.001)
+    llm = dispatcher.bind(create_groq_llm(http_client, api_base=f"http://127.0.0.1:{port}/v1"))
+
+    try:
+        first = await llm.acomplete("What was Adobe's revenue?")
+        second = await llm.acomplete("And its margin?")
+    finally:
+        await http_client.aclose()
+        server.close()
+
+    assert str(first) == str(second) == "stub answer"
+    assert dispatcher.get_stats()["rate_limited"] == 1
+    assert len(connections) == 1
+
+
+@pytest.mark.asyncio
+async def test_usage_is_metered_per_request_including_spawned_tasks():
+    dispatcher = LLMDispatcher(completion_tokens=0)
+
+    async def respond():
+        return SimpleNamespace(raw={"usage": {"total_tokens": 42}})
+
+    with track_llm_usage() as meter:
+        task = asyncio.create_task(dispatcher.call(respond))
+    await task
+    await dispatcher.call(respond)
+
+    assert meter == {"calls": 1, "tokens": 42}
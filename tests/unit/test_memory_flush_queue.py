@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import Mock, AsyncMock
+from llama_index.core.llms import ChatMessage
+from src.memory.flush_queue import MemoryFlushQueue
+
+
+def _turn(text):
+    return [ChatMessage(role="user", content=text), ChatMessage(role="assistant", content="ok")]
+
+
+@pytest.mark.asyncio
+async def test_turns_are_batched_into_one_flush():
+    long_term_memory = Mock()
+    long_term_memory.process_memory_flush = AsyncMock(return_value=[])
+    queue = MemoryFlushQueue(long_term_memory, batch_size=3, batch_wait=0.05)
+
+    for i in range(3):
+        assert queue.submit(_turn(f"turn {i}"))
+    queue.start()
+    await queue.drain(timeout=1)
+
+    long_term_memory.process_memory_flush.assert_awaited_once()
+    messages = long_term_memory.process_memory_flush.call_args.args[0]
+    assert len(messages) == 6
+    assert queue.stats["flushed_turns"] == 3
+
+
+@pytest.mark.asyncio
+async def test_only_failed_blocks_are_retried():
+    long_term_memory = Mock()
+    long_term_memory.process_memory_flush = AsyncMock(side_effect=[["facts"], []])
+    queue = MemoryFlushQueue(long_term_memory, batch_wait=0, retry_backoff=0)
+
+    queue.submit(_turn("turn"))
+    queue.start()
+    await queue.drain(timeout=1)
+
+    assert long_term_memory.process_memory_flush.await_count == 2
+    assert long_term_memory.process_memory_flush.call_args.kwargs["block_names"] == ["facts"]
+    assert queue.stats["flushed_turns"] == 1
+
+
+def test_submit_drops_turns_when_queue_is_full():
+    queue = MemoryFlushQueue(Mock(), max_queue_size=1)
+
+    assert queue.submit(_turn("first"))
+    assert not queue.submit(_turn("second"))
+    assert queue.stats["dropped"] == 1
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.workflows.router import QueryRouter, RouteTelemetry, heuristic_complexity, train_router
+
+SHORT_QUERIES = [f"What was revenue in {year}?" for year in range(2000, 2030)]
+LONG_QUERIES = [
+    f"Compare and contrast revenue and margins in {year}, and summarize how each segment grew or shrank"
+    for year in range(2000, 2030)
+]
+
+
+def _synthetic_records():
+    """Direct answers are accepted for short questions only; planned answers always are"""
+    records = []
+    for i, query in enumerate(SHORT_QUERIES + LONG_QUERIES):
+        is_short = query in SHORT_QUERIES
+        records.append({"query": query, "route": "direct", "latency": 1.0, "tokens": 800, "accepted": is_short})
+        records.append({"query": query, "route": "planning", "latency": 6.0, "tokens": 4000, "accepted": True})
+    return records
+
+
+def _embedding(query):
+    return [len(query) / 100.0, 1.0]
+
+
+def test_heuristic_complexity_scores():
+    assert heuristic_complexity("Simple query?") == 0.0
+    assert heuristic_complexity(LONG_QUERIES[0]) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_telemetry_joins_routes_with_feedback(tmp_path):
+    telemetry = RouteTelemetry(tmp_path / "routes.jsonl")
+
+    await telemetry.record_route("q1", "What was revenue?", "direct", 1.2, 900)
+    await telemetry.record_route("q2", "Compare segments", "planning", 5.0, 4000)
+    await telemetry.record_feedback("q1", False)
+    await telemetry.record_feedback("q1", True)
+
+    records = telemetry.load()
+    assert len(records) == 1
+    assert records[0]["query_id"] == "q1"
+    assert records[0]["accepted"] is True
+    assert records[0]["tokens"] == 900
+
+
+@pytest.mark.asyncio
+async def test_trained_router_picks_cheapest_acceptable_path(tmp_path):
+    records = _synthetic_records()
+    model = train_router(records, [_embedding(r["query"]) for r in records], min_samples=10)
+    model_path = tmp_path / "router_model.npz"
+    with open(model_path, "wb") as f:
+        np.savez(f, **model)
+
+    embed_model = Mock()
+    embed_model.aget_query_embedding = AsyncMock(side_effect=lambda q: _embedding(q))
+    router = QueryRouter(embed_model=embed_model, model_path=str(model_path), speculative=False)
+
+    assert await router.choose("What was revenue in 2031?") == "direct"
+    assert await router.choose(
+        "Compare and contrast revenue and margins in 2031, and summarize how each segment grew or shrank"
+    ) == "planning"
+    assert router.get_stats()["model"] == 2
+
+
+def test_cached_answers_label_acceptance_but_not_cost():
+    records = _synthetic_records()
+    records += [{**r, "latency": 0.0, "tokens": 0, "cached": True} for r in _synthetic_records()]
+    model = train_router(records, [_embedding(r["query"]) for r in records], min_samples=10)
+
+    assert model["direct_tokens"] == 800
+    assert model["planning_latency"] == 6.0
+
+
+def test_training_needs_enough_samples_per_path():
+    records = [r for r in _synthetic_records() if r["route"] == "direct"]
+    assert train_router(records, [_embedding(r["query"]) for r in records], min_samples=10) is None
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_to_heuristic():
+    embed_model = Mock()
+    embed_model.aget_query_embedding = AsyncMock(side_effect=RuntimeError("model unavailable"))
+    router = QueryRouter(embed_model=embed_model, model_path=None, speculative=False)
+
+    assert await router.choose("Simple query?") == "direct"
+    assert await router.choose(LONG_QUERIES[0]) == "planning"
+    assert router.get_stats() == {"model": 0, "heuristic": 2, "model_loaded": False}
@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+from unittest.mock import Mock, AsyncMock
+from src.utils.semantic_cache import SemanticCache
+
+
+@pytest.fixture
+def semantic_cache():
+    """
+    Fixture that provides a SemanticCache backed by a mocked embedding model.
+    """
+    embed_model = Mock()
+    embed_model.aget_query_embedding = AsyncMock(return_value=[1.0, 0.0])
+    return SemanticCache(embed_model=embed_model, threshold=0.9, near_miss_margin=0.1, max_entries=2)
+
+
+@pytest.mark.asyncio
+async def test_embed_normalizes_vectors(semantic_cache):
+    semantic_cache.embed_model.aget_query_embedding.return_value = [3.0, 4.0]
+    embedding = await semantic_cache.embed("What was Adobe's Q2 revenue?")
+    assert np.allclose(embedding, [0.6, 0.8])
+
+
+def test_lookup_hit_near_miss_and_miss(semantic_cache):
+    semantic_cache.add(np.array([1.0, 0.0], dtype=np.float32), "hash_a")
+
+    assert semantic_cache.lookup(np.array([0.95, np.sqrt(1 - 0.95 ** 2)], dtype=np.float32)) == "hash_a"
+    assert semantic_cache.lookup(np.array([0.85, np.sqrt(1 - 0.85 ** 2)], dtype=np.float32)) is None
+    assert semantic_cache.lookup(np.array([0.0, 1.0], dtype=np.float32)) is None
+
+    stats = semantic_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["near_misses"] == 1
+    assert stats["misses"] == 1
+
+
+def test_add_overwrites_oldest_entry_when_full(semantic_cache):
+    semantic_cache.add(np.array([1.0, 0.0], dtype=np.float32), "hash_a")
+    semantic_cache.add(np.array([0.0, 1.0], dtype=np.float32), "hash_b")
+    semantic_cache.add(np.array([-1.0, 0.0], dtype=np.float32), "hash_c")
+
+    assert semantic_cache.lookup(np.array([1.0, 0.0], dtype=np.float32)) is None
+    assert semantic_cache.lookup(np.array([-1.0, 0.0], dtype=np.float32)) == "hash_c"
+    assert semantic_cache.get_stats()["entries"] == 2
+
+
+def test_lookup_ignores_other_scopes(semantic_cache):
+    semantic_cache.add(np.array([1.0, 0.0], dtype=np.float32), "hash_a", scope="corpus_a:session_1")
+
+    assert semantic_cache.lookup(np.array([1.0, 0.0], dtype=np.float32), scope="corpus_a:session_2") is None
+    assert semantic_cache.lookup(np.array([1.0, 0.0], dtype=np.float32), scope="corpus_a:session_1") == "hash_a"
@@ -0,0 +1,45 @@
+import pytest
+import pytest_asyncio
+from src.memory.session_store import SessionStore
+
+
+@pytest_asyncio.fixture
+async def session_store(tmp_path):
+    """
+    Fixture that provides a SessionStore persisting to a temporary SQLite file.
+    """
+    store = SessionStore(database_uri=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}", max_hot_sessions=2)
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_session_survives_eviction_from_hot_tier(session_store):
+    memory = session_store.get("session_a")
+    await memory.add_message("user", "I'm researching Adobe's revenue.")
+
+    # Push session_a out of the two-slot hot tier.
+    session_store.get("session_b")
+    session_store.get("session_c")
+    assert len(session_store) == 2
+
+    reloaded = session_store.get("session_a")
+    assert reloaded is not memory
+    context = await reloaded.get_context()
+    assert [m.content for m in context] == ["I'm researching Adobe's revenue."]
+
+
+@pytest.mark.asyncio
+async def test_hot_session_is_reused(session_store):
+    assert session_store.get("session_a") is session_store.get("session_a")
+
+
+@pytest.mark.asyncio
+async def test_evict_idle_purges_expired_sessions(session_store):
+    await session_store.get("session_a").add_message("user", "Hello")
+    session_store.idle_ttl = 0
+    session_store.retention = 0
+
+    assert await session_store.evict_idle() == 1
+    assert len(session_store) == 0
+    assert await session_store.get("session_a").get_context() == []
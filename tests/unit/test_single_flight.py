@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"response": "answer"}
+
+    waiters = [asyncio.create_task(single_flight.do("q", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert single_flight.get_stats()["waiters"] == 5
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert all(result == {"response": "answer"} for result in results)
+    stats = single_flight.get_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["peak_waiters"] == 5
+    assert stats["in_flight"] == stats["waiters"] == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_and_next_call_runs_again():
+    single_flight = SingleFlight()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def succeed():
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        await single_flight.do("q", fail)
+    assert await single_flight.do("q", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_other_waiters():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "ok"
+
+    first = asyncio.create_task(single_flight.do("q", work))
+    second = asyncio.create_task(single_flight.do("q", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "ok"
+    assert first.cancelled()
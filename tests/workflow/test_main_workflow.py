@@ -1,7 +1,10 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
-from src.workflows.main_workflow import MainResearchWorkflow
+from src.workflows.main_workflow import MainResearchWorkflow, ProgressEvent, SourcesEvent, TokenEvent
 from llama_index.core.workflow import StartEvent
+from llama_index.core.schema import NodeWithScore, TextNode
 
 
 @pytest.fixture
@@ -26,6 +29,7 @@ def mock_memory_system():
 def mock_query_engine():
     engine = Mock()
     engine.aquery = AsyncMock(return_value="Direct query result.")
+    engine.aretrieve = AsyncMock(return_value=[])
     return engine
 
 
@@ -50,6 +54,7 @@ async def test_main_research_workflow_simple_query_e2e(
         memory_system=mock_memory_system,
         query_engines={"default": mock_query_engine},
         query_planning_workflow=mock_query_planning_workflow,
+        fast_path=False,
     )
 
     # Act
@@ -87,3 +92,396 @@ async def test_main_research_workflow_complex_query_e2e(
     assert mock_query_engine.aquery.call_count == 0
     assert mock_query_planning_workflow.run.call_count == 1
     assert mock_memory_system["short_term"].add_message.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_streams_progress_and_tokens(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    async def token_stream():
+        for delta in ["Final ", "response."]:
+            yield Mock(delta=delta)
+
+    mock_llm.astream_complete = AsyncMock(return_value=token_stream())
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+
+    # Act
+    handler = workflow.run(query="Simple query?", stream=True)
+    events = [ev async for ev in handler.stream_events()]
+    result = await handler
+
+    # Assert
+    steps = [ev.step for ev in events if isinstance(ev, ProgressEvent)]
+    assert steps == ["initialize_session", "process_query", "generate_response"]
+    assert any(isinstance(ev, SourcesEvent) for ev in events)
+    assert [ev.delta for ev in events if isinstance(ev, TokenEvent)] == ["Final ", "response."]
+    assert result["response"] == "Final response."
+    assert mock_llm.acomplete.call_count == 0
+    mock_memory_system["short_term"].add_message.assert_any_call("assistant", "Final response.")
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_defers_long_term_memory_to_flush_queue(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_memory_system["flush_queue"] = Mock()
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+
+    # Act
+    await workflow.run(query="Simple query?")
+
+    # Assert
+    mock_memory_system["flush_queue"].submit.assert_called_once()
+    assert mock_memory_system["long_term"].process_memory_flush.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_fast_path_makes_a_single_llm_call(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_query_engine.aretrieve.return_value = [
+        NodeWithScore(node=TextNode(text="Revenue was $5.87 billion."), score=0.9)
+    ]
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+        fast_path=False,
+    )
+
+    # Act
+    # The per-request flag overrides the workflow default.
+    result = await workflow.run(query="Simple query?", fast_path=True)
+
+    # Assert
+    assert result["response"] == "Final response."
+    assert mock_query_engine.aquery.call_count == 0
+    assert mock_query_engine.aretrieve.call_count == 1
+    assert mock_llm.acomplete.call_count == 1
+    assert "Revenue was $5.87 billion." in mock_llm.acomplete.call_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_takes_the_route_it_was_admitted_with(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+        fast_path=False,
+    )
+    workflow.choose_route = AsyncMock(return_value="direct")
+
+    # Act
+    # The query would route direct; the caller already admitted it to the planning pool.
+    await workflow.run(query="Simple query?", route="planning")
+
+    # Assert
+    workflow.choose_route.assert_not_called()
+    assert mock_query_planning_workflow.run.call_count == 1
+    assert mock_query_engine.aquery.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_direct_path_embeds_history_but_matches_keywords_on_the_question(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_memory_system["short_term"].get_context.return_value = [Mock(role="user", content="Tell me about Adobe.")]
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+
+    # Act
+    await workflow.run(query="Simple query?", fast_path=True)
+
+    # Assert
+    query_bundle = mock_query_engine.aretrieve.call_args.args[0]
+    assert query_bundle.query_str == "Simple query?"
+    assert query_bundle.embedding_strs == ["user: Tell me about Adobe.\n\nQuery: Simple query?"]
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_degrades_under_a_tight_latency_budget(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_query_engine.aretrieve.return_value = [
+        NodeWithScore(node=TextNode(text=f"Passage {i}."), score=0.9) for i in range(3)
+    ]
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+        fast_path=False,
+    )
+    complex_query = "Compare and contrast the revenue and the margins, and summarize how each segment grew?"
+
+    # Act
+    result = await workflow.run(query=complex_query, latency_budget=1.0)
+
+    # Assert
+    assert result["degradations"] == ["skipped_long_term_memory", "planning_to_direct", "fast_path", "top_k=1"]
+    assert mock_memory_system["long_term"].get_relevant_context.call_count == 0
+    assert mock_query_planning_workflow.run.call_count == 0
+    assert mock_query_engine.aquery.call_count == 0
+    assert len(result["sources"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_treats_a_spent_budget_as_no_time_left(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_query_engine.aretrieve.return_value = [NodeWithScore(node=TextNode(text="Passage 0."), score=0.9)]
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+        fast_path=False,
+    )
+
+    # Act
+    # A budget spent while queueing for admission arrives as zero or less, not as "no budget".
+    result = await workflow.run(query="Simple query?", latency_budget=-0.5)
+
+    # Assert
+    assert result["degradations"] == ["skipped_long_term_memory", "fast_path", "top_k=1", "generation_timeout"]
+    assert result["response"] == "Passage 0."
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_bounds_generation_by_the_deadline(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    async def slow_generation(prompt):
+        await asyncio.sleep(1)
+        return "Final response."
+
+    mock_llm.acomplete = slow_generation
+    mock_query_engine.aquery.return_value = Mock(__str__=lambda self: "Direct query result.", source_nodes=[])
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+        fast_path=False,
+    )
+
+    # Act
+    with patch("src.workflows.main_workflow.DEGRADE_LONG_TERM_MIN_TIME", 0), \
+            patch("src.workflows.main_workflow.DEGRADE_REDUCED_K_TIME", 0), \
+            patch("src.workflows.main_workflow.DEGRADE_GENERATION_RESERVE", 0):
+        started = time.monotonic()
+        result = await workflow.run(query="Simple query?", latency_budget=0.1)
+
+    # Assert
+    assert time.monotonic() - started < 0.5
+    assert result["degradations"] == ["generation_timeout"]
+    assert result["response"] == "Direct query result."
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_caps_sub_queries_to_fit_the_budget(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_query_planning_workflow.max_sub_queries = 5
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+    complex_query = "Compare and contrast the revenue and the margins, and summarize how each segment grew?"
+
+    # Act
+    # 15.5s leaves about 12.5s after the generation reserve: room for four 3s sub-queries
+    result = await workflow.run(query=complex_query, latency_budget=15.5)
+
+    # Assert
+    assert result["degradations"] == ["max_sub_queries=4"]
+    assert mock_query_planning_workflow.run.call_args.kwargs["max_sub_queries"] == 4
+
+
+@pytest.mark.asyncio
+async def test_main_research_workflow_without_budget_applies_no_degradations(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+
+    result = await workflow.run(query="Simple query?")
+
+    assert result["degradations"] == []
+
+
+BORDERLINE_QUERY = "What was Adobe revenue in 2023 and how did Digital Media and Digital Experience grow?"
+
+
+@pytest.mark.asyncio
+async def test_speculative_route_returns_sufficient_direct_answer_and_cancels_planning(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+):
+    # Arrange
+    planning_finished = asyncio.Event()
+
+    async def slow_plan(**kwargs):
+        await asyncio.sleep(0.05)
+        planning_finished.set()
+        return "Planned query result."
+
+    planning_workflow = Mock()
+    planning_workflow.run = slow_plan
+    mock_query_engine.aretrieve.return_value = [
+        NodeWithScore(
+            node=TextNode(text="Adobe revenue in 2023 was $19.41 billion as Digital Media and Digital Experience grow."),
+            score=0.9,
+        )
+    ]
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=planning_workflow,
+    )
+
+    # Act
+    result = await workflow.run(query=BORDERLINE_QUERY)
+
+    # Assert
+    assert await workflow.choose_route(BORDERLINE_QUERY) == "speculative"
+    assert result["route"] == "speculative_direct"
+    await asyncio.sleep(0.1)
+    assert not planning_finished.is_set()
+    assert mock_llm.acomplete.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_speculative_route_falls_back_to_planned_answer(
+    mock_llm,
+    mock_memory_system,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    mock_query_engine.aretrieve.return_value = [
+        NodeWithScore(node=TextNode(text="Unrelated passage about office locations."), score=0.9)
+    ]
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system=mock_memory_system,
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+
+    # Act
+    result = await workflow.run(query=BORDERLINE_QUERY)
+
+    # Assert
+    assert result["route"] == "speculative_planning"
+    assert mock_query_planning_workflow.run.call_count == 1
+    assert "Planned query result." in mock_llm.acomplete.call_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_one_workflow_instance_serves_concurrent_sessions(
+    mock_llm,
+    mock_query_engine,
+    mock_query_planning_workflow,
+):
+    # Arrange
+    long_term = AsyncMock()
+    long_term.get_relevant_context.return_value = ""
+    sessions = {name: AsyncMock() for name in ("alice", "bob")}
+    for memory in sessions.values():
+        memory.get_context.return_value = []
+    workflow = MainResearchWorkflow(
+        llm=mock_llm,
+        tools=[],
+        memory_system={"long_term": long_term},
+        query_engines={"default": mock_query_engine},
+        query_planning_workflow=mock_query_planning_workflow,
+    )
+
+    # Act
+    await asyncio.gather(*(
+        workflow.run(query=f"Simple query from {name}?", user_id=name, short_term_memory=memory)
+        for name, memory in sessions.items()
+    ))
+
+    # Assert
+    for name, memory in sessions.items():
+        assert memory.add_message.call_args_list[0].args == ("user", f"Simple query from {name}?")
+        assert memory.add_message.call_count == 2
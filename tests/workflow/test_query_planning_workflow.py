@@ -1,9 +1,14 @@
 
+import asyncio
+import time
 import pytest
 from unittest.mock import Mock, AsyncMock
 
-from llama_index.core.workflow import Workflow
-from src.workflows.query_planning_workflow import QueryPlanningWorkflow, SubQueriesExecutedEvent
+from llama_index.core.workflow import StartEvent, Workflow
+from src.workflows.query_planning_workflow import (
+    QueryPlanningWorkflow, QueryDecompositionEvent, SubQueriesExecutedEvent
+)
+from src.workflows.plan_cache import PlanCache, SubQueryResultCache
 
 
 @pytest.fixture
@@ -46,7 +51,7 @@ async def test_plan_query_step(mock_llm):
     workflow = QueryPlanningWorkflow(llm=mock_llm, query_engines={})
     mock_context = Mock()
     mock_context.store = AsyncMock()
-    mock_start_event = Mock(query="test query")
+    mock_start_event = StartEvent(query="test query")
 
     # Act
     result_event = await workflow.plan_query(mock_context, mock_start_event)
@@ -61,7 +66,7 @@ async def test_execute_sub_queries_step(mock_query_engine):
     # Arrange
     workflow = QueryPlanningWorkflow(llm=Mock(), query_engines={"default": mock_query_engine})
     mock_context = Mock()
-    mock_decomposition_event = Mock(sub_queries=["sub_query_1", "sub_query_2"])
+    mock_decomposition_event = QueryDecompositionEvent(query="q", sub_queries=["sub_query_1", "sub_query_2"])
 
     # Act
     result_event = await workflow.execute_sub_queries(mock_context, mock_decomposition_event)
@@ -72,3 +77,188 @@ async def test_execute_sub_queries_step(mock_query_engine):
     assert result_event.sub_results[0]["query"] == "sub_query_1"
     assert result_event.sub_results[1]["result"] == "This is the answer."
     assert mock_query_engine.aquery.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_execute_sub_queries_runs_concurrently_with_bounded_fan_out():
+    # Arrange
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def slow_aquery(sub_query):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return f"Answer to {sub_query}"
+
+    engine = Mock()
+    engine.aquery = slow_aquery
+    workflow = QueryPlanningWorkflow(llm=Mock(), query_engines={"default": engine}, max_concurrency=2)
+    mock_decomposition_event = QueryDecompositionEvent(query="q", sub_queries=[f"sub_query_{i}" for i in range(5)])
+
+    # Act
+    result_event = await workflow.execute_sub_queries(Mock(), mock_decomposition_event)
+
+    # Assert
+    assert peak_in_flight == 2
+    # Results keep the order of the plan, not the order of completion.
+    assert [res["query"] for res in result_event.sub_results] == [f"sub_query_{i}" for i in range(5)]
+    assert result_event.sub_results[4]["result"] == "Answer to sub_query_4"
+
+
+@pytest.mark.asyncio
+async def test_execute_sub_queries_returns_partial_results_on_timeout():
+    # Arrange
+    async def aquery(sub_query):
+        if sub_query == "slow":
+            await asyncio.sleep(1)
+        return "This is the answer."
+
+    engine = Mock()
+    engine.aquery = aquery
+    workflow = QueryPlanningWorkflow(llm=Mock(), query_engines={"default": engine}, sub_query_timeout=0.05)
+    mock_decomposition_event = QueryDecompositionEvent(query="q", sub_queries=["fast", "slow"])
+
+    # Act
+    result_event = await workflow.execute_sub_queries(Mock(), mock_decomposition_event)
+
+    # Assert
+    assert result_event.sub_results[0]["result"] == "This is the answer."
+    assert "error" not in result_event.sub_results[0]
+    assert "Timed out" in result_event.sub_results[1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_plan_query_reuses_cached_decomposition(mock_llm):
+    # Arrange
+    plan_cache = PlanCache()
+    workflow = QueryPlanningWorkflow(llm=mock_llm, query_engines={}, plan_cache=plan_cache)
+    mock_context = Mock()
+    mock_context.store = AsyncMock()
+
+    # Act
+    first = await workflow.plan_query(mock_context, StartEvent(query="Compare Digital Media and Digital Experience growth"))
+    second = await workflow.plan_query(mock_context, StartEvent(query="compare digital media and digital experience growth?"))
+
+    # Assert
+    assert mock_llm.acomplete.call_count == 1
+    assert second.sub_queries == first.sub_queries == ["What is X?", "How does Y work?"]
+    assert plan_cache.get_stats()["hits"] == 1
+    assert plan_cache.get_stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_similar_plans_are_only_reused_for_the_same_entities_and_numbers():
+    # Arrange
+    # Every query embeds identically, so only the entity and number check tells them apart.
+    embed_model = Mock()
+    embed_model.aget_query_embedding = AsyncMock(return_value=[1.0, 0.0])
+    plan_cache = PlanCache(embed_model=embed_model)
+    await plan_cache.put("Compare Adobe revenue growth in 2023 by segment", ["What was Adobe revenue in 2023?"])
+
+    # Act / Assert
+    assert await plan_cache.get("How did Adobe's revenue grow in 2023, by segment?") == ["What was Adobe revenue in 2023?"]
+    assert await plan_cache.get("Compare Adobe revenue growth in 2022 by segment") is None
+    assert await plan_cache.get("Compare Oracle revenue growth in 2023 by segment") is None
+    assert plan_cache.get_stats()["semantic_hits"] == 1
+    assert plan_cache.get_stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_execute_sub_queries_skips_near_duplicate_sub_queries(mock_query_engine):
+    # Arrange
+    workflow = QueryPlanningWorkflow(llm=Mock(), query_engines={"default": mock_query_engine})
+    mock_decomposition_event = QueryDecompositionEvent(query="q", sub_queries=[
+        "What was Adobe revenue in 2023?",
+        "what was the Adobe revenue in 2023",
+        "How did Digital Media grow?",
+    ])
+
+    # Act
+    result_event = await workflow.execute_sub_queries(Mock(), mock_decomposition_event)
+
+    # Assert
+    assert [res["query"] for res in result_event.sub_results] == [
+        "What was Adobe revenue in 2023?", "How did Digital Media grow?"
+    ]
+    assert mock_query_engine.aquery.call_count == 2
+
+
+class InMemoryCacheManager:
+    current_corpus_fingerprint = "corpus-v1"
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get_cached_response(self, query_hash, namespace="response"):
+        return self.entries.get(f"{namespace}:{query_hash}")
+
+    async def cache_response(self, query_hash, response, ttl=0, tags=(), namespace="response"):
+        self.entries[f"{namespace}:{query_hash}"] = response
+
+
+@pytest.mark.asyncio
+async def test_sub_query_results_are_shared_across_runs(mock_query_engine):
+    # Arrange
+    result_cache = SubQueryResultCache(InMemoryCacheManager())
+    workflow = QueryPlanningWorkflow(llm=Mock(), query_engines={"default": mock_query_engine}, result_cache=result_cache)
+
+    # Act
+    await workflow.execute_sub_queries(Mock(), QueryDecompositionEvent(query="q", sub_queries=["What is X?"]))
+    result_event = await workflow.execute_sub_queries(
+        Mock(), QueryDecompositionEvent(query="q", sub_queries=["what is x", "How does Y work?"])
+    )
+
+    # Assert
+    assert mock_query_engine.aquery.call_count == 2
+    assert result_event.sub_results[0] == {"query": "what is x", "result": "This is the answer.", "sources": []}
+    assert result_cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_sub_queries_respects_latency_budget():
+    # Arrange
+    async def aquery(sub_query):
+        if sub_query == "slow":
+            await asyncio.sleep(1)
+        return "This is the answer."
+
+    engine = Mock()
+    engine.aquery = aquery
+    workflow = QueryPlanningWorkflow(llm=Mock(), query_engines={"default": engine})
+    mock_decomposition_event = QueryDecompositionEvent(
+        query="q", sub_queries=["fast", "slow", "dropped"], max_sub_queries=2, deadline=time.monotonic() + 0.05
+    )
+
+    # Act
+    result_event = await workflow.execute_sub_queries(Mock(), mock_decomposition_event)
+
+    # Assert
+    assert [res["query"] for res in result_event.sub_results] == ["fast", "slow"]
+    assert "Timed out" in result_event.sub_results[1]["error"]
+
+
+
+@pytest.mark.asyncio
+async def test_planning_and_synthesis_calls_stop_at_the_deadline(mock_query_engine):
+    # Arrange
+    async def slow_llm(prompt):
+        await asyncio.sleep(1)
+        return "1. What is X?\n2. How does Y work?"
+
+    llm = Mock()
+    llm.acomplete = slow_llm
+    workflow = QueryPlanningWorkflow(llm=llm, query_engines={"default": mock_query_engine})
+
+    # Act
+    started = time.monotonic()
+    result = await workflow.run(query="Tell me about X and Y.", deadline=time.monotonic() + 0.1)
+
+    # Assert
+    # The planner timed out, so the question became its own sub-query; with the deadline
+    # spent, synthesis was skipped and the raw sub-query results came back instead.
+    assert time.monotonic() - started < 0.5
+    mock_query_engine.aquery.assert_called_once_with("Tell me about X and Y.")
+    assert result.startswith("Sub-query: Tell me about X and Y.\nResult:")